@@ -6,14 +6,16 @@ CustomTkinter provides a modern, customizable look for Tkinter applications.
 """
 
 import customtkinter as ctk
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import threading
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, get_or_build, preload_dependencies, reset_caches
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")
@@ -25,7 +27,11 @@ class EpanetCustomTkinterApp(ctk.CTk):
     
     def __init__(self):
         super().__init__()
+        # Warm up epyt/matplotlib in the background while the window is shown
+        threading.Thread(target=preload_dependencies, daemon=True).start()
         self.epanet = EpanetWrapper()
+        # Single worker so simulations run off the Tk thread one at a time
+        self._executor = ThreadPoolExecutor(max_workers=1)
         self.init_ui()
     
     def init_ui(self):
@@ -56,6 +62,12 @@ class EpanetCustomTkinterApp(ctk.CTk):
                                          command=self.load_file, width=200)
         self.load_button.pack(side="left", padx=5)
         
+        # Reload file button (re-reads the file from disk)
+        self.reload_button = ctk.CTkButton(button_frame, text="Reload", 
+                                           command=self.reload_file, width=100,
+                                           state="disabled")
+        self.reload_button.pack(side="left", padx=5)
+        
         # Run simulation button
         self.run_button = ctk.CTkButton(button_frame, text="Run Simulation", 
                                         command=self.run_simulation, width=200,
@@ -68,10 +80,54 @@ class EpanetCustomTkinterApp(ctk.CTk):
                                            state="disabled")
         self.display_button.pack(side="left", padx=5)
         
-        # Matplotlib Figure for Network Visualization
-        self.figure, self.ax = plt.subplots(figsize=(8, 6))
-        self.canvas = FigureCanvasTkAgg(self.figure, master=main_frame)
+        # Matplotlib Figure for Network Visualization, created on first display
+        self._plot_frame = main_frame
+        self.figure = None
+        self.ax = None
+        self.canvas = None
+        
+        # Cached bitmap of the last full render, restored by blitting on redisplay.
+        # It is (re)captured whenever the canvas finishes drawing, including after resizes.
+        self._bg = None
+        self._plot_dirty = True
+        # Connection ids of the view-change callbacks, see _connect_edge_lod
+        self._lod_cids = []
+    
+    def _ensure_canvas(self):
+        """Create the matplotlib figure and canvas on first use."""
+        if self.canvas is not None:
+            return
+        
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        
+        # Standalone figure; pyplot's figure manager is not needed for an embedded canvas
+        self.figure = Figure(figsize=(8, 6))
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self._plot_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True, pady=10)
+        self.canvas.mpl_connect('draw_event', self._capture_background)
+    
+    def _connect_edge_lod(self):
+        """Connect the view-change callbacks once per render, dropping the previous ones."""
+        for cid in self._lod_cids:
+            self.ax.callbacks.disconnect(cid)
+        self._lod_cids = [self.ax.callbacks.connect(signal, self._on_view_changed)
+                          for signal in ('xlim_changed', 'ylim_changed')]
+    
+    def _on_view_changed(self, ax):
+        """Re-bin the pipes of the current network when the view is zoomed or panned."""
+        self.epanet.update_edge_lod(ax)
+    
+    def _capture_background(self, event=None):
+        """Cache the rendered canvas bitmap once it shows the current network."""
+        if not self._plot_dirty and self.canvas.supports_blit:
+            self._bg = self.canvas.copy_from_bbox(self.figure.bbox)
+    
+    def _invalidate_background(self):
+        """Drop the cached plot bitmap so the next display does a full redraw."""
+        self._bg = None
+        self._plot_dirty = True
     
     def load_file(self):
         """Load an EPANET input file."""
@@ -79,17 +135,35 @@ class EpanetCustomTkinterApp(ctk.CTk):
         
         file_path = filedialog.askopenfilename(filetypes=[("EPANET Input Files", "*.inp")])
         if file_path:
-            try:
-                inp_path = Path(file_path)
-                self.epanet.load_file(inp_path)
-                
-                file_name = self.epanet.get_file_name()
-                self.status_label.configure(text=f"Loaded: {file_name}")
-                self.run_button.configure(state="normal")
-                self.display_button.configure(state="normal")
-                self.display_network()
-            except Exception as e:
-                self.status_label.configure(text=f"Error: {e}")
+            self._open_file(Path(file_path))
+    
+    def reload_file(self):
+        """Reload the current file from disk, discarding cached results."""
+        inp_path = self.epanet.get_file_path()
+        if inp_path is not None:
+            reset_caches()
+            self._open_file(inp_path)
+    
+    def _open_file(self, inp_path):
+        """Show the (possibly cached) network of an input file."""
+        try:
+            self.epanet = get_or_build(inp_path)
+            self._invalidate_background()
+            
+            file_name = self.epanet.get_file_name()
+            self.status_label.configure(text=f"Loaded: {file_name}")
+            self.run_button.configure(state="normal")
+            self.reload_button.configure(state="normal")
+            self.display_button.configure(state="normal")
+            # Let Tk paint the new status first; render on the next idle tick
+            self.after_idle(self.display_network)
+        except Exception as e:
+            self.status_label.configure(text=f"Error: {e}")
+    
+    def _set_actions_state(self, state):
+        """Enable or disable every button that uses the EPANET toolkit."""
+        for button in (self.load_button, self.reload_button, self.run_button, self.display_button):
+            button.configure(state=state)
     
     def run_simulation(self):
         """Run the EPANET simulation."""
@@ -97,21 +171,44 @@ class EpanetCustomTkinterApp(ctk.CTk):
             self.status_label.configure(text="No file loaded!")
             return
         
+        # The toolkit is not thread-safe: no loads or redraws until the solve is done
+        self._set_actions_state("disabled")
+        self.status_label.configure(text="Running simulation...")
+        future = self._executor.submit(self.epanet.run_simulation)
+        self.after(50, self._poll_simulation, future)
+    
+    def _poll_simulation(self, future):
+        """Wait for the background simulation and report its outcome."""
+        if not future.done():
+            self.after(50, self._poll_simulation, future)
+            return
+        
+        self._set_actions_state("normal")
         try:
-            self.epanet.run_simulation()
+            future.result()
             self.status_label.configure(text="Simulation completed!")
         except Exception as e:
             self.status_label.configure(text=f"Simulation error: {e}")
     
     def display_network(self):
         """Display the network visualization."""
-        if not self.epanet.is_loaded():
+        if not self.epanet.is_loaded() or self.display_button.cget("state") == "disabled":
             return
         
         try:
+            self._ensure_canvas()
+            if not self._plot_dirty and self._bg is not None:
+                # Network unchanged since the last full render - blit the cached bitmap
+                self.canvas.restore_region(self._bg)
+                self.canvas.blit(self.figure.bbox)
+                return
+            
             self.ax.clear()
             self.epanet.plot_network(ax=self.ax)
-            self.canvas.draw()
+            # Re-bin the pipes of large networks when the view is zoomed or panned
+            self._connect_edge_lod()
+            self._plot_dirty = False
+            self.canvas.draw_idle()
         except Exception as e:
             self.status_label.configure(text=f"Visualization error: {e}")
 
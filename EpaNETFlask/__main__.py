@@ -5,22 +5,60 @@ This module provides a Flask-based web GUI for EPANET network analysis.
 Run with: python -m EpaNETFlask
 """
 
-from flask import Flask, render_template_string, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify
+from werkzeug.utils import secure_filename
 from pathlib import Path
+from urllib.parse import unquote
 import sys
 import io
 import base64
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, preload_dependencies
 
 app = Flask(__name__)
 app.epanet = EpanetWrapper()
 
+# Persistent figure and SVG canvas, created on the first /plot_network request
+# (keeping startup quick); only used while _toolkit_lock is held
+_figure = None
+
+
+def _get_figure():
+    """Get the shared figure and SVG canvas, creating them on first use."""
+    global _figure
+    if _figure is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_svg import FigureCanvasSVG
+        
+        fig = Figure(figsize=(10, 8))
+        _figure = (fig, FigureCanvasSVG(fig))
+    return _figure
+
+
+# Simulations run on a single background worker; results are polled by job id
+_sim_executor = ThreadPoolExecutor(max_workers=1)
+# job id -> [future, time the job was first seen finished]
+_sim_jobs = {}
+# Finished jobs whose status is never polled are dropped after this many seconds
+_SIM_JOB_TTL = 600
+# The epyt toolkit is not thread-safe: uploads are rejected while a simulation holds this,
+# and network renders wait for it
+_toolkit_lock = threading.Lock()
+
+# Rendered network SVGs keyed by the content hash of the loaded file
+app._svg_cache = {}
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
@@ -64,8 +102,15 @@ HTML_TEMPLATE = """
     <script>
         document.getElementById('uploadForm').addEventListener('submit', async (e) => {
             e.preventDefault();
-            const formData = new FormData(e.target);
-            const response = await fetch('/upload', { method: 'POST', body: formData });
+            const file = e.target.elements.file.files[0];
+            const response = await fetch('/upload', {
+                method: 'POST',
+                body: file,
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'X-Filename': encodeURIComponent(file.name)
+                }
+            });
             const data = await response.json();
             document.getElementById('status').textContent = data.message;
             if (data.success) {
@@ -77,7 +122,18 @@ HTML_TEMPLATE = """
         async function runSimulation() {
             const response = await fetch('/run_simulation', { method: 'POST' });
             const data = await response.json();
-            alert(data.message);
+            if (!data.job_id) {
+                alert(data.message);
+                return;
+            }
+            document.getElementById('status').textContent = data.message;
+            let status;
+            do {
+                await new Promise(resolve => setTimeout(resolve, 500));
+                status = await (await fetch('/status/' + data.job_id)).json();
+            } while (status.done === false);
+            document.getElementById('status').textContent = status.message;
+            alert(status.message);
         }
         
         async function displayNetwork() {
@@ -93,74 +149,145 @@ HTML_TEMPLATE = """
 """
 
 
+# The page has no template variables, so it is encoded once and served as-is
+_INDEX_BYTES = HTML_TEMPLATE.encode('utf-8')
+_INDEX_ETAG = hashlib.md5(_INDEX_BYTES).hexdigest()
+
+
+def _cached_response(body, mimetype, etag, cache_control):
+    """Return body with an ETag, or 304 Not Modified if the client already has it."""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
 @app.route('/')
 def index():
     """Main page."""
-    return render_template_string(HTML_TEMPLATE)
+    return _cached_response(_INDEX_BYTES, 'text/html', _INDEX_ETAG, 'public, max-age=3600')
 
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Handle file upload."""
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'message': 'No file provided'})
-    
-    file = request.files['file']
-    if file.filename == '':
+    """Handle file upload sent as the raw request body."""
+    filename = secure_filename(unquote(request.headers.get('X-Filename', '')))
+    if filename == '':
         return jsonify({'success': False, 'message': 'No file selected'})
     
-    if file.filename.endswith('.inp'):
+    if filename.endswith('.inp'):
+        if not _toolkit_lock.acquire(blocking=False):
+            return jsonify({'success': False,
+                            'message': 'A simulation is running, upload again when it has finished'}), 409
         try:
-            # Save temporarily
-            temp_path = Path('/tmp') / file.filename
-            file.save(str(temp_path))
-            
-            app.epanet.load_file(temp_path)
-            return jsonify({'success': True, 'message': f'File loaded: {file.filename}'})
+            # The wrapper streams the body to a temporary file, bypassing multipart parsing
+            app.epanet.load_file(request.stream, name=filename)
+            app.epanet.precompute_layout()
+            app._svg_cache.clear()
+            return jsonify({'success': True, 'message': f'File loaded: {filename}'})
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error: {e}'})
+        finally:
+            _toolkit_lock.release()
     
     return jsonify({'success': False, 'message': 'Invalid file type'})
 
 
 @app.route('/run_simulation', methods=['POST'])
 def run_simulation():
-    """Run EPANET simulation."""
+    """Start an EPANET simulation in the background and return its job id."""
     if not app.epanet.is_loaded():
         return jsonify({'success': False, 'message': 'No file loaded'})
     
-    try:
-        app.epanet.run_simulation()
-        return jsonify({'success': True, 'message': 'Simulation completed!'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error: {e}'})
+    _prune_sim_jobs()
+    job_id = uuid.uuid4().hex
+    _sim_jobs[job_id] = [_sim_executor.submit(_run_simulation_job, app.epanet), None]
+    return jsonify({'success': True, 'job_id': job_id, 'message': 'Simulation running...'}), 202
+
+
+def _run_simulation_job(epanet):
+    """Run a simulation on the worker, keeping uploads out of the toolkit meanwhile."""
+    with _toolkit_lock:
+        epanet.run_simulation()
+
+
+def _prune_sim_jobs():
+    """Drop finished jobs whose status was not polled within _SIM_JOB_TTL seconds."""
+    now = time.monotonic()
+    for job_id, job in list(_sim_jobs.items()):
+        future, finished_at = job
+        if not future.done():
+            continue
+        if finished_at is None:
+            job[1] = now
+        elif now - finished_at > _SIM_JOB_TTL:
+            _sim_jobs.pop(job_id, None)
+
+
+@app.route('/status/<job_id>')
+def simulation_status(job_id):
+    """Report the state of a background simulation."""
+    _prune_sim_jobs()
+    job = _sim_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown simulation job'}), 404
+    
+    future = job[0]
+    if not future.done():
+        return jsonify({'done': False, 'message': 'Simulation running...'})
+    
+    _sim_jobs.pop(job_id, None)
+    error = future.exception()
+    if error is not None:
+        return jsonify({'done': True, 'success': False, 'message': f'Error: {error}'})
+    return jsonify({'done': True, 'success': True, 'message': 'Simulation completed!'})
 
 
 @app.route('/plot_network')
 def plot_network():
-    """Generate and return network plot."""
+    """Generate and return network plot as SVG."""
     if not app.epanet.is_loaded():
         return jsonify({'error': 'No file loaded'}), 400
     
     try:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        app.epanet.plot_network(ax=ax)
-        
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png')
-        img_buffer.seek(0)
-        plt.close(fig)
+        # Hash, render and cache insert see the same network: an upload cannot swap it meanwhile
+        with _toolkit_lock:
+            key = app.epanet.get_file_hash()
+            if key not in app._svg_cache:
+                app._svg_cache[key] = _render_network_svg()
+            svg = app._svg_cache[key]
         
-        return send_file(img_buffer, mimetype='image/png')
+        # The URL is shared by every loaded file, so clients must revalidate the ETag
+        return _cached_response(svg, 'image/svg+xml', key, 'no-cache')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _render_network_svg():
+    """Render the loaded network on the shared figure and return the SVG bytes (holding _toolkit_lock)."""
+    img_buffer = io.BytesIO()
+    fig, canvas = _get_figure()
+    fig.clear()
+    ax = fig.add_subplot(111)
+    app.epanet.plot_network(ax=ax)
+    canvas.print_svg(img_buffer)
+    return img_buffer.getvalue()
+
+
 def main():
     """Main entry point."""
     print("Starting EPANET Flask GUI...")
+    # Warm up epyt/matplotlib in the background so the first request is fast
+    threading.Thread(target=preload_dependencies, daemon=True).start()
     print("Open your browser and navigate to: http://127.0.0.1:5000")
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    try:
+        # Multi-threaded production server, so status polls are answered while a simulation runs
+        from waitress import serve
+    except ImportError:
+        # Fall back to the threaded development server, without the debug reloader
+        app.run(debug=False, threaded=True, host='127.0.0.1', port=5000)
+    else:
+        serve(app, host='127.0.0.1', port=5000, threads=8)
 
 
 if __name__ == '__main__':
@@ -8,13 +8,16 @@ Flet is a Flutter-based framework for building cross-platform apps.
 import flet as ft
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
+import asyncio
 import io
 import base64
+import threading
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, get_or_build, preload_dependencies
 
 
 def main(page: ft.Page):
@@ -23,23 +26,32 @@ def main(page: ft.Page):
     page.vertical_alignment = ft.MainAxisAlignment.START
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
     
+    # Warm up epyt/matplotlib in the background while the page is built
+    threading.Thread(target=preload_dependencies, daemon=True).start()
     epanet = EpanetWrapper()
     
+    # Last rendered network image, reused while the loaded file is unchanged
+    render_cache = {'key': None, 'svg_b64': None}
+    
     # Status text
     status_text = ft.Text("No file loaded.", size=16)
     
     # File picker
     def on_file_picked(e: ft.FilePickerResultEvent):
+        nonlocal epanet
         if e.files and len(e.files) > 0:
             file_path = Path(e.files[0].path)
+            # Apply every change first and send them to the client in one update
             try:
-                epanet.load_file(file_path)
+                epanet = get_or_build(file_path)
+                render_cache['key'] = None
+                render_cache['svg_b64'] = None
                 status_text.value = f"Loaded: {file_path.name}"
                 run_btn.disabled = False
                 display_btn.disabled = False
-                page.update()
             except Exception as ex:
                 status_text.value = f"Error: {ex}"
+            finally:
                 page.update()
     
     file_picker = ft.FilePicker(on_result=on_file_picked)
@@ -57,56 +69,75 @@ def main(page: ft.Page):
     run_btn = ft.ElevatedButton(
         "Run Simulation",
         disabled=True,
-        on_click=lambda _: run_simulation(epanet, status_text, page)
+        on_click=lambda _: page.run_task(run_simulation, epanet, status_text, page)
     )
     
     display_btn = ft.ElevatedButton(
         "Display Network",
         disabled=True,
-        on_click=lambda _: display_network(epanet, status_text, page)
+        on_click=lambda _: page.run_task(display_network, epanet, status_text, page)
     )
     
     # Image for network plot
     network_image = ft.Image(src_base64="", width=800, height=600, visible=False)
     
-    def run_simulation(epanet_wrapper, status, page_ref):
+    async def run_simulation(epanet_wrapper, status, page_ref):
         """Run EPANET simulation."""
         if not epanet_wrapper.is_loaded():
             status.value = "No file loaded!"
             page_ref.update()
             return
         
+        status.value = "Running simulation..."
+        # The toolkit is not thread-safe: no file picks or renders until the solve is done
+        load_btn.disabled = run_btn.disabled = display_btn.disabled = True
+        page_ref.update()
         try:
-            epanet_wrapper.run_simulation()
+            # Solve on a worker thread so the event loop keeps serving the page
+            await asyncio.to_thread(epanet_wrapper.run_simulation)
             status.value = "Simulation completed!"
-            page_ref.show_snack_bar(ft.SnackBar(ft.Text("Simulation completed successfully!")))
+            page_ref.snack_bar = ft.SnackBar(ft.Text("Simulation completed successfully!"), open=True)
         except Exception as e:
             status.value = f"Simulation error: {e}"
+        load_btn.disabled = run_btn.disabled = display_btn.disabled = False
+        # Status, buttons and snack bar go out in a single update
         page_ref.update()
     
-    def display_network(epanet_wrapper, status, page_ref):
-        """Display network visualization."""
-        if not epanet_wrapper.is_loaded():
-            status.value = "No file loaded!"
-            page_ref.update()
-            return
+    def render_network_svg(epanet_wrapper):
+        """Render the network as SVG and return it base64-encoded."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_svg import FigureCanvasSVG
+        
+        # Standalone figure, bypassing pyplot's global figure manager
+        fig = Figure(figsize=(10, 8))
+        canvas = FigureCanvasSVG(fig)
+        ax = fig.add_subplot(111)
+        epanet_wrapper.plot_network(ax=ax)
         
+        # Render as SVG (vector, rasterized by Flutter) and convert to base64
+        img_buffer = io.BytesIO()
+        canvas.print_svg(img_buffer)
+        return base64.b64encode(img_buffer.getvalue()).decode()
+    
+    async def display_network(epanet_wrapper, status, page_ref):
+        """Display network visualization."""
+        # Apply every change first and send them to the client in one update
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            epanet_wrapper.plot_network(ax=ax)
+            if not epanet_wrapper.is_loaded():
+                status.value = "No file loaded!"
+                return
             
-            # Convert to base64
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png')
-            img_buffer.seek(0)
-            img_base64 = base64.b64encode(img_buffer.read()).decode()
-            plt.close(fig)
+            # Hashing and rendering run on a worker thread; widgets are updated here
+            key = await asyncio.to_thread(epanet_wrapper.get_file_hash)
+            if render_cache['key'] != key:
+                render_cache['svg_b64'] = await asyncio.to_thread(render_network_svg, epanet_wrapper)
+                render_cache['key'] = key
             
-            network_image.src_base64 = img_base64
+            network_image.src_base64 = render_cache['svg_b64']
             network_image.visible = True
-            page_ref.update()
         except Exception as e:
             status.value = f"Visualization error: {e}"
+        finally:
             page_ref.update()
     
     # Layout
@@ -5,6 +5,7 @@ This module provides a Kivy-based GUI for EPANET network analysis.
 """
 
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
@@ -12,16 +13,21 @@ from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.popup import Popup
 from pathlib import Path
 import sys
+import threading
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, preload_dependencies
 
 
 class EpanetKivyApp(App):
     """Main Kivy application for EPANET."""
     
     def build(self):
+        # Warm up epyt in the background while the widgets are built
+        threading.Thread(target=preload_dependencies, daemon=True).start()
         self.epanet = EpanetWrapper()
         
         # Main layout
@@ -36,9 +42,9 @@ class EpanetKivyApp(App):
         layout.add_widget(self.status_label)
         
         # Load file button
-        load_btn = Button(text='Load .inp File', size_hint_y=None, height=40)
-        load_btn.bind(on_press=self.load_file)
-        layout.add_widget(load_btn)
+        self.load_btn = Button(text='Load .inp File', size_hint_y=None, height=40)
+        self.load_btn.bind(on_press=self.load_file)
+        layout.add_widget(self.load_btn)
         
         # Run simulation button
         self.run_btn = Button(text='Run Simulation', size_hint_y=None, height=40, disabled=True)
@@ -68,11 +74,34 @@ class EpanetKivyApp(App):
             self.show_error("No file loaded!")
             return
         
+        # The toolkit is not thread-safe: no loads or redraws until the solve is done
+        self._set_actions_disabled(True)
+        self.status_label.text = 'Running simulation...'
+        threading.Thread(target=self._simulation_worker, daemon=True).start()
+    
+    def _simulation_worker(self):
+        """Run the simulation off the Kivy main thread."""
         try:
             self.epanet.run_simulation()
-            self.show_success("Simulation completed!")
         except Exception as e:
-            self.show_error(f"Simulation error: {e}")
+            message = f"Simulation error: {e}"
+            Clock.schedule_once(lambda dt: self._on_simulation_done(message, success=False))
+        else:
+            Clock.schedule_once(lambda dt: self._on_simulation_done("Simulation completed!", success=True))
+    
+    def _set_actions_disabled(self, disabled):
+        """Disable or enable every button that uses the EPANET toolkit."""
+        for button in (self.load_btn, self.run_btn, self.display_btn):
+            button.disabled = disabled
+    
+    def _on_simulation_done(self, message, success):
+        """Report the simulation outcome on the Kivy main thread."""
+        self._set_actions_disabled(False)
+        self.status_label.text = message
+        if success:
+            self.show_success(message)
+        else:
+            self.show_error(message)
     
     def display_network(self, instance):
         """Display the network visualization."""
@@ -5,39 +5,139 @@ This module provides a PyQt/PySide-based GUI for EPANET network analysis.
 """
 
 import sys
+import threading
 from pathlib import Path
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QPushButton, QLabel, QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+                             QPushButton, QLabel, QFileDialog, QMessageBox,
+                             QGraphicsView, QGraphicsScene, QGraphicsItem)
+from PyQt6.QtGui import QBrush, QColor, QFont, QPainter, QPainterPath, QPen
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, get_or_build, preload_dependencies, reset_caches
 
 
-class NetworkPlotWidget(QWidget):
-    """Widget for displaying network plots."""
+class NetworkPlotWidget(QGraphicsView):
+    """Widget for displaying network plots.
+    
+    The network is drawn natively with QPainter through a QGraphicsScene:
+    all pipes form a single QPainterPath, and the view supports wheel zoom
+    and drag panning without re-rendering through matplotlib.
+    """
+    
+    NODE_RADIUS = 8  # Node marker radius in pixels
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.figure = Figure(figsize=(6, 4))
-        self.canvas = FigureCanvas(self.figure)
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
+        self.setScene(QGraphicsScene(self))
+        self.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        
+        # The scene keeps showing the last network until a new file is loaded
+        self._plot_dirty = True
+    
+    def invalidate(self):
+        """Mark the scene as stale so the next plot rebuilds it."""
+        self._plot_dirty = True
     
     def plot_network(self, epanet_wrapper):
         """Plot the network using the epanet wrapper."""
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
+        if not self._plot_dirty:
+            return  # Scene already shows the current network
+        
         try:
-            epanet_wrapper.plot_network(ax=ax)
-            self.canvas.draw()
+            node_ids, node_coords, segs = epanet_wrapper.get_layout_arrays()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Visualization error: {e}")
+            return
+        
+        scene = self.scene()
+        scene.clear()
+        
+        # All pipes as one path; y is negated because Qt's y axis points down
+        pipes = QPainterPath()
+        for (x0, y0), (x1, y1) in segs.tolist():
+            pipes.moveTo(x0, -y0)
+            pipes.lineTo(x1, -y1)
+        pipe_pen = QPen(QColor('gray'), 2)
+        pipe_pen.setCosmetic(True)  # Constant width in pixels at any zoom
+        pipe_item = scene.addPath(pipes, pipe_pen)
+        pipe_item.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+        
+        # Nodes and labels keep their pixel size at any zoom
+        r = self.NODE_RADIUS
+        node_brush = QBrush(QColor('lightblue'))
+        label_font = QFont()
+        label_font.setPointSize(8)
+        label_font.setBold(True)
+        for node_id, (x, y) in zip(node_ids, node_coords.tolist()):
+            node = scene.addEllipse(-r, -r, 2 * r, 2 * r, QPen(Qt.PenStyle.NoPen), node_brush)
+            node.setPos(x, -y)
+            node.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations)
+            
+            label = scene.addSimpleText(str(node_id), label_font)
+            rect = label.boundingRect()
+            label.setParentItem(node)
+            label.setPos(-rect.width() / 2, -rect.height() / 2)
+        
+        self.fitInView(pipe_item.boundingRect() if segs.size else scene.itemsBoundingRect(),
+                       Qt.AspectRatioMode.KeepAspectRatio)
+        self._plot_dirty = False
+    
+    def wheelEvent(self, event):
+        """Zoom in or out around the mouse cursor."""
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        self.scale(factor, factor)
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by background runners back to the GUI thread."""
+    
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+
+class SimulationRunner(QRunnable):
+    """Runs the EPANET simulation on a QThreadPool worker."""
+    
+    def __init__(self, epanet_wrapper):
+        super().__init__()
+        self.epanet = epanet_wrapper
+        self.signals = WorkerSignals()
+    
+    def run(self):
+        """Run the simulation and report the outcome through signals."""
+        self.signals.progress.emit("Running simulation...")
+        try:
+            self.epanet.run_simulation()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(self.epanet)
+
+
+class LoadRunner(QRunnable):
+    """Loads an input file and computes its layout on a QThreadPool worker."""
+    
+    def __init__(self, inp_path):
+        super().__init__()
+        self.inp_path = inp_path
+        self.signals = WorkerSignals()
+    
+    def run(self):
+        """Load the file and report the resulting wrapper through signals."""
+        self.signals.progress.emit(f"Loading {self.inp_path.name}...")
+        try:
+            epanet_wrapper = get_or_build(self.inp_path)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(epanet_wrapper)
 
 
 class EpanetPyQtApp(QMainWindow):
@@ -45,6 +145,8 @@ class EpanetPyQtApp(QMainWindow):
     
     def __init__(self):
         super().__init__()
+        # Warm up epyt/NetworkX in the background while the window is shown
+        threading.Thread(target=preload_dependencies, daemon=True).start()
         self.epanet = EpanetWrapper()
         self.init_ui()
     
@@ -66,6 +168,12 @@ class EpanetPyQtApp(QMainWindow):
         self.load_button.clicked.connect(self.load_file)
         layout.addWidget(self.load_button)
         
+        # Reload file button (re-reads the file from disk)
+        self.reload_button = QPushButton("Reload")
+        self.reload_button.clicked.connect(self.reload_file)
+        self.reload_button.setEnabled(False)
+        layout.addWidget(self.reload_button)
+        
         # Run simulation button
         self.run_button = QPushButton("Run Simulation")
         self.run_button.clicked.connect(self.run_simulation)
@@ -88,16 +196,47 @@ class EpanetPyQtApp(QMainWindow):
         )
         
         if file_path:
-            try:
-                inp_path = Path(file_path)
-                self.epanet.load_file(inp_path)
-                
-                file_name = self.epanet.get_file_name()
-                self.status_label.setText(f"Loaded: {file_name}")
-                self.run_button.setEnabled(True)
-                self.plot_widget.plot_network(self.epanet)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to load file: {e}")
+            self._open_file(Path(file_path))
+    
+    def reload_file(self):
+        """Reload the current file from disk, discarding cached results."""
+        inp_path = self.epanet.get_file_path()
+        if inp_path is not None:
+            reset_caches()
+            self._open_file(inp_path)
+    
+    def _open_file(self, inp_path):
+        """Load the (possibly cached) network of an input file in the background."""
+        self.load_button.setEnabled(False)
+        self.reload_button.setEnabled(False)
+        self.run_button.setEnabled(False)
+        
+        # Keep a reference so the signals object outlives the worker
+        self._load_runner = LoadRunner(inp_path)
+        self._load_runner.signals.progress.connect(self.status_label.setText)
+        self._load_runner.signals.finished.connect(self.on_file_loaded)
+        self._load_runner.signals.error.connect(self.on_load_error)
+        QThreadPool.globalInstance().start(self._load_runner)
+    
+    def on_file_loaded(self, epanet_wrapper):
+        """Show the network loaded by the background worker."""
+        self.epanet = epanet_wrapper
+        self.plot_widget.invalidate()
+        
+        file_name = self.epanet.get_file_name()
+        self.status_label.setText(f"Loaded: {file_name}")
+        self.load_button.setEnabled(True)
+        self.run_button.setEnabled(True)
+        self.reload_button.setEnabled(True)
+        self.plot_widget.plot_network(self.epanet)
+    
+    def on_load_error(self, message):
+        """Handle a failed background file load."""
+        self.load_button.setEnabled(True)
+        self.run_button.setEnabled(self.epanet.is_loaded())
+        self.reload_button.setEnabled(self.epanet.is_loaded())
+        self.status_label.setText("Load failed")
+        QMessageBox.critical(self, "Error", f"Failed to load file: {message}")
     
     def run_simulation(self):
         """Run the EPANET simulation."""
@@ -105,11 +244,32 @@ class EpanetPyQtApp(QMainWindow):
             QMessageBox.warning(self, "Warning", "No file loaded!")
             return
         
-        try:
-            self.epanet.run_simulation()
-            QMessageBox.information(self, "Success", "Simulation completed!")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Simulation error: {e}")
+        # The toolkit is not thread-safe: no loads until the solve is done
+        self._set_actions_enabled(False)
+        
+        # Keep a reference so the signals object outlives the worker
+        self._sim_runner = SimulationRunner(self.epanet)
+        self._sim_runner.signals.progress.connect(self.status_label.setText)
+        self._sim_runner.signals.finished.connect(self.on_simulation_finished)
+        self._sim_runner.signals.error.connect(self.on_simulation_error)
+        QThreadPool.globalInstance().start(self._sim_runner)
+    
+    def _set_actions_enabled(self, enabled):
+        """Enable or disable every button that uses the EPANET toolkit."""
+        for button in (self.load_button, self.reload_button, self.run_button):
+            button.setEnabled(enabled)
+    
+    def on_simulation_finished(self, epanet_wrapper):
+        """Handle successful completion of the background simulation."""
+        self._set_actions_enabled(True)
+        self.status_label.setText("Simulation completed!")
+        QMessageBox.information(self, "Success", "Simulation completed!")
+    
+    def on_simulation_error(self, message):
+        """Handle a failed background simulation."""
+        self._set_actions_enabled(True)
+        self.status_label.setText("Simulation failed")
+        QMessageBox.critical(self, "Error", f"Simulation error: {message}")
 
 
 def main():
@@ -7,23 +7,303 @@ Run with: streamlit run EpaNETStreamlit/__main__.py
 
 import streamlit as st
 from pathlib import Path
+import hashlib
+import io
+import os
+import re
 import sys
-import matplotlib.pyplot as plt
+import threading
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# Headless server: pick Agg before anything (including epyt) imports pyplot
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
 
 st.set_page_config(page_title="EPANET Streamlit GUI", layout="wide")
 
 st.title("EPANET Network Analysis")
 
+
+def _wrapper():
+    """Import the wrapper module on first use, keeping it off the landing page path."""
+    import epanet_wrapper
+    return epanet_wrapper
+
+
+def _mpl():
+    """Import the matplotlib Figure and Agg canvas classes on first plot."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    return Figure, FigureCanvasAgg
+
+
+@st.cache_resource(show_spinner=False)
+def _toolkit_lock():
+    """
+    Lock shared by all sessions around every use of the EPANET toolkit.
+    
+    epyt drives one global EPANET project per process, so sessions must not
+    load, solve or plot at the same time.
+    """
+    return threading.RLock()
+
+
+def _load_epanet(upload, name: str):
+    """
+    Load an uploaded .inp file into a wrapper owned by the current session.
+    
+    The upload is streamed to disk by the wrapper in 1 MiB chunks instead of
+    being copied into a bytes object first. Wrappers are not shared between
+    sessions, so one user's upload is never solved or plotted for another.
+    """
+    wrapper = _wrapper().EpanetWrapper()
+    upload.seek(0)
+    with _toolkit_lock():
+        wrapper.load_file(upload, name=name)
+        wrapper.precompute_layout()
+    return wrapper
+
+
 # Initialize session state
 if 'epanet' not in st.session_state:
-    st.session_state.epanet = EpanetWrapper()
+    st.session_state.epanet = None  # Created with the first loaded file
     st.session_state.simulation_run = False
     st.session_state.file_loaded = False
 
+
+# Comma/whitespace separated tokens of the time series ID input
+_TOKEN_RE = re.compile(r'[^,\s]+')
+
+
+@st.cache_data(show_spinner=False)
+def _parse_indices(raw: str):
+    """
+    Parse the time series ID input into indices and IDs.
+    
+    Integer tokens become int indices, anything else is kept as an ID string.
+    
+    Returns:
+        List of ints/strings, or None if the input is empty
+    """
+    tokens = _TOKEN_RE.findall(raw)
+    if not tokens:
+        return None
+    return [int(t) if t.isdigit() or (t[:1] == '-' and t[1:].isdigit()) else t for t in tokens]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _list_samples(samples_dir: str):
+    """List the .inp sample files as sorted (name, path) pairs; rescanned at most once a minute."""
+    try:
+        with os.scandir(samples_dir) as entries:
+            return tuple(sorted((e.name, e.path) for e in entries
+                                if e.is_file() and e.name.lower().endswith('.inp')))
+    except FileNotFoundError:
+        return ()
+
+
+# Plot type -> (wrapper method, fixed kwargs, kwargs set from the Show Labels option)
+_PLOT_CFG = {
+    'topology': ('plot_network_topology', {}, ('nodesID', 'linksID')),
+    'elevation': ('plot_network_attributes', {'attribute': 'elevation'}, ()),
+    'pressure': ('plot_network_attributes', {'attribute': 'pressure'}, ('pressure_text',)),
+    'flow': ('plot_network_attributes', {'attribute': 'flow'}, ('flow_text',)),
+    'quality': ('plot_network_attributes', {'attribute': 'quality'}, ()),
+}
+
+
+def _draw_plot(epanet, ax, plot_type_lower, show_labels, use_epyt_native):
+    """Draw one of the network plot types on ax."""
+    method_name, fixed_kwargs, label_kwargs = _PLOT_CFG[plot_type_lower]
+    kwargs = dict(fixed_kwargs, **dict.fromkeys(label_kwargs, show_labels))
+    getattr(epanet, method_name)(ax=ax, use_epyt_native=use_epyt_native, **kwargs)
+
+
+# Figure size (inches) and dpi of the default topology thumbnail and of explicit plots
+THUMB = (5, 3.5), 72
+FULL = (12, 8), 80
+
+
+# Room for every plot type/label/EPyT/simulated combination of one network (5*2*2*2)
+# plus its thumbnail
+@st.cache_data(show_spinner=False, max_entries=41)
+def _plot_png(_epanet, network_key, plot_type_lower, show_labels, use_epyt_native, simulated,
+              size=FULL) -> bytes:
+    """
+    Render a network plot to PNG bytes on a standalone Agg figure.
+    
+    Cached per network content hash and plot options; `simulated` is part of
+    the key so result plots are redrawn once a simulation has been run.
+    `size` is a (figsize, dpi) pair such as THUMB or FULL.
+    """
+    Figure, FigureCanvasAgg = _mpl()
+    figsize, dpi = size
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    _draw_plot(_epanet, ax, plot_type_lower, show_labels, use_epyt_native)
+    buf = io.BytesIO()
+    canvas.print_png(buf)
+    return buf.getvalue()
+
+
+def _show(fig, slot=st):
+    """Display a figure as a pre-rendered PNG instead of handing it to st.pyplot.
+    
+    Args:
+        fig: Figure to render
+        slot: Container to draw into, e.g. an st.empty() placeholder
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=90)
+    slot.image(buf.getvalue(), use_container_width=True)
+
+
+@st.fragment
+def render_plot_area():
+    """
+    Plot type selection and the selected network plot.
+    
+    Runs as a fragment: changing the plot type or clicking Update Plot reruns
+    only this block instead of the whole script.
+    """
+    show_labels = st.session_state.get('show_labels', False)
+    use_epyt_native = st.session_state.get('use_epyt', False)
+    
+    with st.expander("Visualization", expanded=True):
+        plot_type = st.radio(
+            "Plot Type",
+            ["Topology", "Elevation", "Pressure", "Flow", "Quality"],
+            key="plot_type",
+            horizontal=True
+        )
+        
+        plot_type_lower = plot_type.lower()
+        
+        # Check if simulation is needed
+        needs_simulation = plot_type_lower in ['pressure', 'flow', 'quality'] and not st.session_state.simulation_run
+        if needs_simulation:
+            st.warning("⚠️ Run simulation first")
+        update_plot = st.button("Update Plot", disabled=needs_simulation, key="update_plot")
+    
+    # Fixed slot for the plot so a new image replaces the old one in place
+    plot_slot = st.empty()
+    epanet = st.session_state.epanet
+    network_key = epanet.get_file_hash()
+    if update_plot:
+        try:
+            with _toolkit_lock():
+                png = _plot_png(epanet, network_key, plot_type_lower, show_labels,
+                                use_epyt_native, st.session_state.simulation_run)
+            # Kept so that reruns not triggered by Update Plot show it again
+            st.session_state.last_plot = (network_key, png)
+        except Exception as e:
+            plot_slot.error(f"Visualization error: {e}")
+            return
+    
+    last_plot = st.session_state.get('last_plot')
+    if last_plot is not None and last_plot[0] == network_key:
+        plot_slot.image(last_plot[1], use_container_width=True)
+        return
+    
+    # Until a full plot of this network exists, show a small thumbnail rendered once per file
+    try:
+        with _toolkit_lock():
+            png = _plot_png(epanet, network_key, 'topology', False, False, False, size=THUMB)
+        plot_slot.image(png)
+    except Exception:
+        pass
+
+
+@st.cache_data(show_spinner=False)
+def _all_ids_csv(n: int) -> str:
+    """
+    Build the "1,2,...,n" string that selects every node or link.
+    
+    Depends only on the count, so networks (and node/link lists) of the same
+    size share one cached string.
+    """
+    import numpy as np
+    
+    # Format in numpy and join plain str objects; np.array2string would pad
+    # entries to equal width
+    return ','.join(np.arange(1, n + 1, dtype=np.int64).astype(str).tolist())
+
+
+@st.cache_resource(show_spinner=False)
+def _index_labels(_names, network_key: str, kind: str):
+    """
+    Build the selection labels for one ID list of a network.
+    
+    Cached per network and kind ('node'/'link'); the results are only read,
+    so they are shared between reruns without copying.
+    
+    Returns:
+        Tuple of ("Index i: ID" labels, label -> index dict, "1,2,...,n" string)
+    """
+    import numpy as np
+    
+    idx_arr = np.arange(1, len(_names) + 1)
+    labels = [f"Index {i}: {name}" for i, name in zip(idx_arr.tolist(), _names)]
+    label_to_idx = dict(zip(labels, idx_arr.tolist()))
+    return labels, label_to_idx, _all_ids_csv(len(_names))
+
+
+@st.fragment
+def render_network_info(stats):
+    """
+    Node and link ID listing with index selection.
+    
+    Runs as a fragment so selecting IDs does not re-render the plots.
+    """
+    with st.expander("Network Information - Node and Link IDs"):
+        try:
+            node_names = stats.get('node_names', [])
+            link_names = stats.get('link_names', [])
+            network_key = st.session_state.epanet.get_file_hash()
+            node_data, node_label_to_idx, all_node_indices = _index_labels(node_names, network_key, 'node')
+            link_data, link_label_to_idx, all_link_indices = _index_labels(link_names, network_key, 'link')
+            
+            tab1, tab2 = st.tabs([f"Nodes ({len(node_names)})", f"Links ({len(link_names)})"])
+            
+            with tab1:
+                # Display nodes with index and ID
+                selected_nodes = st.multiselect(
+                    "Select nodes to copy indices",
+                    node_data,
+                    key="node_select"
+                )
+                if selected_nodes:
+                    indices_str = ','.join(str(node_label_to_idx[item]) for item in selected_nodes)
+                    st.code(indices_str, language=None)
+                    if st.button("Copy Node Indices", key="copy_nodes"):
+                        st.code(indices_str)
+                else:
+                    # Show all
+                    st.code(f"All node indices: {all_node_indices}", language=None)
+            
+            with tab2:
+                # Display links with index and ID
+                selected_links = st.multiselect(
+                    "Select links to copy indices",
+                    link_data,
+                    key="link_select"
+                )
+                if selected_links:
+                    indices_str = ','.join(str(link_label_to_idx[item]) for item in selected_links)
+                    st.code(indices_str, language=None)
+                    if st.button("Copy Link Indices", key="copy_links"):
+                        st.code(indices_str)
+                else:
+                    # Show all
+                    st.code(f"All link indices: {all_link_indices}", language=None)
+        except Exception as e:
+            st.error(f"Error showing network info: {e}")
+
+
 # Sidebar for controls
 with st.sidebar:
     # Toolbox (expandable)
@@ -32,15 +312,23 @@ with st.sidebar:
         uploaded_file = st.file_uploader("Upload EPANET .inp file", type=['inp'], key="file_upload")
         
         if uploaded_file is not None:
-            # Save uploaded file temporarily
-            temp_path = Path("/tmp") / uploaded_file.name
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
             try:
-                st.session_state.epanet.load_file(temp_path)
+                # The uploader re-fires on every rerun; hash each new upload once and
+                # only load when its content differs from the loaded network
+                if st.session_state.get('upload_id') != uploaded_file.file_id:
+                    st.session_state.upload_id = uploaded_file.file_id
+                    st.session_state.upload_hash = hashlib.blake2b(
+                        uploaded_file.getbuffer(), digest_size=16).hexdigest()
+                if st.session_state.get('loaded_hash') != st.session_state.upload_hash:
+                    epanet = _load_epanet(uploaded_file, uploaded_file.name)
+                    if st.session_state.get('loaded_hash'):
+                        # The previous upload's wrapper belongs to this session only
+                        with _toolkit_lock():
+                            st.session_state.epanet.close()
+                    st.session_state.epanet = epanet
+                    st.session_state.simulation_run = epanet.has_simulation_results()
+                    st.session_state.loaded_hash = st.session_state.upload_hash
                 st.session_state.file_loaded = True
-                st.session_state.simulation_run = False
                 st.success(f"✓ Loaded: {uploaded_file.name}")
             except Exception as e:
                 st.error(f"Error loading file: {e}")
@@ -50,7 +338,7 @@ with st.sidebar:
         if st.button("Run Simulation", disabled=not st.session_state.file_loaded, use_container_width=True):
             if st.session_state.file_loaded:
                 try:
-                    with st.spinner("Running simulation..."):
+                    with st.spinner("Running simulation..."), _toolkit_lock():
                         st.session_state.epanet.run_simulation()
                         st.session_state.simulation_run = True
                     st.success("✓ Simulation completed!")
@@ -67,11 +355,24 @@ with st.sidebar:
         st.checkbox("Show Labels", value=False, disabled=not st.session_state.file_loaded, key="show_labels")
         st.checkbox("EPyT Native Plot", value=False, disabled=not st.session_state.file_loaded, key="use_epyt")
     
+    # Network statistics, fetched once per loaded network and shared by the sidebar
+    # and the main area on every rerun
+    stats = {}
+    if st.session_state.file_loaded:
+        try:
+            stats_key = st.session_state.epanet.get_file_hash()
+            if st.session_state.get('stats_key') != stats_key:
+                with _toolkit_lock():
+                    st.session_state.stats = st.session_state.epanet.get_statistics()
+                st.session_state.stats_key = stats_key
+            stats = st.session_state.stats
+        except Exception:
+            pass
+    
     # Network Statistics
     if st.session_state.file_loaded:
         with st.expander("Network Stats", expanded=True):
             try:
-                stats = st.session_state.epanet.get_statistics()
                 st.write(f"**Nodes:** {stats.get('node_count', 'N/A')}")
                 st.write(f"**Links:** {stats.get('link_count', 'N/A')}")
                 if st.session_state.simulation_run:
@@ -81,27 +382,6 @@ with st.sidebar:
             except Exception:
                 pass
     
-    # Visualization (expandable)
-    if st.session_state.file_loaded:
-        with st.expander("Visualization", expanded=True):
-            # Plot type selection
-            plot_type = st.radio(
-                "Plot Type",
-                ["Topology", "Elevation", "Pressure", "Flow", "Quality"],
-                key="plot_type"
-            )
-            
-            plot_type_lower = plot_type.lower()
-            
-            # Check if simulation is needed
-            if plot_type_lower in ['pressure', 'flow', 'quality'] and not st.session_state.simulation_run:
-                st.warning("⚠️ Run simulation first")
-            else:
-                # Update plot button
-                if st.button("Update Plot", use_container_width=True, key="update_plot"):
-                    st.session_state.update_plot_trigger = True
-                    st.rerun()
-    
     # Time Series (expandable)
     if st.session_state.file_loaded:
         with st.expander("Time Series", expanded=False):
@@ -127,192 +407,75 @@ with st.sidebar:
 
 # Main content area
 if st.session_state.file_loaded:
-    # Get options from session state
-    show_labels = st.session_state.get('show_labels', False)
-    use_epyt_native = st.session_state.get('use_epyt', False)
+    # Per-rerun state, read once into locals
+    ss = st.session_state
+    epanet = ss.epanet
+    plot_ts = ss.pop('plot_ts_trigger', False)
     
-    # Handle plot updates
-    if st.session_state.get('update_plot_trigger', False):
-        st.session_state.update_plot_trigger = False
-        try:
-            plot_type = st.session_state.get('plot_type', 'Topology')
-            plot_type_lower = plot_type.lower()
-            
-            fig, ax = plt.subplots(figsize=(12, 8))
-            
-            if plot_type_lower == "topology":
-                st.session_state.epanet.plot_network_topology(
-                    ax=ax, 
-                    use_epyt_native=use_epyt_native,
-                    nodesID=show_labels,
-                    linksID=show_labels
-                )
-            elif plot_type_lower == "elevation":
-                st.session_state.epanet.plot_network_attributes(
-                    ax=ax, 
-                    attribute='elevation',
-                    use_epyt_native=use_epyt_native
-                )
-            elif plot_type_lower == "pressure":
-                st.session_state.epanet.plot_network_attributes(
-                    ax=ax, 
-                    attribute='pressure',
-                    use_epyt_native=use_epyt_native,
-                    pressure_text=show_labels
-                )
-            elif plot_type_lower == "flow":
-                st.session_state.epanet.plot_network_attributes(
-                    ax=ax, 
-                    attribute='flow',
-                    use_epyt_native=use_epyt_native,
-                    flow_text=show_labels
-                )
-            elif plot_type_lower == "quality":
-                st.session_state.epanet.plot_network_attributes(
-                    ax=ax, 
-                    attribute='quality',
-                    use_epyt_native=use_epyt_native
-                )
-            
-            st.pyplot(fig)
-            plt.close(fig)
-        except Exception as e:
-            st.error(f"Visualization error: {e}")
+    # Plot selection and rendering (reruns on its own)
+    render_plot_area()
     
-    # Handle time series plotting
-    if st.session_state.get('plot_ts_trigger', False):
-        st.session_state.plot_ts_trigger = False
+    # Handle time series plotting, drawn into its own fixed slot
+    ts_slot = st.empty()
+    if plot_ts:
         try:
-            ts_type = st.session_state.get('ts_type', 'Pressure')
-            ts_indices = st.session_state.get('ts_indices', 'J1,J3,J5')
+            ts_type = ss.get('ts_type', 'Pressure').lower()
             
             # Parse indices
-            if ts_indices.strip():
-                items = []
-                for x in ts_indices.split(','):
-                    x = x.strip()
-                    try:
-                        items.append(int(x))
-                    except ValueError:
-                        items.append(x)
-                indices = items
-            else:
-                indices = None
+            indices = _parse_indices(ss.get('ts_indices', 'J1,J3,J5'))
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            # Standalone Agg figure; nothing is registered with pyplot
+            Figure, FigureCanvasAgg = _mpl()
+            fig = Figure(figsize=(10, 6))
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
             
-            if ts_type.lower() == 'pressure':
-                st.session_state.epanet.plot_time_series(
-                    ax=ax, 
-                    node_indices=indices,
-                    plot_type='pressure', 
-                    time_unit='hours'
-                )
-            elif ts_type.lower() == 'velocity':
-                st.session_state.epanet.plot_time_series(
-                    ax=ax, 
-                    link_indices=indices,
-                    plot_type='velocity', 
-                    time_unit='hours'
-                )
-            elif ts_type.lower() == 'flow':
-                st.session_state.epanet.plot_time_series(
-                    ax=ax, 
-                    link_indices=indices,
-                    plot_type='flow', 
-                    time_unit='hours'
-                )
+            with _toolkit_lock():
+                if ts_type == 'pressure':
+                    epanet.plot_time_series(
+                        ax=ax, 
+                        node_indices=indices,
+                        plot_type='pressure', 
+                        time_unit='hours'
+                    )
+                elif ts_type == 'velocity':
+                    epanet.plot_time_series(
+                        ax=ax, 
+                        link_indices=indices,
+                        plot_type='velocity', 
+                        time_unit='hours'
+                    )
+                elif ts_type == 'flow':
+                    epanet.plot_time_series(
+                        ax=ax, 
+                        link_indices=indices,
+                        plot_type='flow', 
+                        time_unit='hours'
+                    )
             
-            st.pyplot(fig)
-            plt.close(fig)
+            _show(fig, ts_slot)
         except Exception as e:
-            st.error(f"Time series plotting failed: {e}")
+            ts_slot.error(f"Time series plotting failed: {e}")
     
     # Network Info expander
-    with st.expander("Network Information - Node and Link IDs"):
-        try:
-            stats = st.session_state.epanet.get_statistics()
-            node_names = stats.get('node_names', [])
-            link_names = stats.get('link_names', [])
-            
-            tab1, tab2 = st.tabs([f"Nodes ({len(node_names)})", f"Links ({len(link_names)})"])
-            
-            with tab1:
-                # Display nodes with index and ID
-                node_data = [f"Index {idx}: {node_id}" for idx, node_id in enumerate(node_names, start=1)]
-                selected_nodes = st.multiselect(
-                    "Select nodes to copy indices",
-                    node_data,
-                    key="node_select"
-                )
-                if selected_nodes:
-                    # Extract indices
-                    indices = []
-                    for item in selected_nodes:
-                        idx = item.split(':')[0].replace('Index ', '')
-                        indices.append(idx)
-                    indices_str = ','.join(indices)
-                    st.code(indices_str, language=None)
-                    if st.button("Copy Node Indices", key="copy_nodes"):
-                        st.code(indices_str)
-                else:
-                    # Show all
-                    all_indices = ','.join([str(i) for i in range(1, len(node_names) + 1)])
-                    st.code(f"All node indices: {all_indices}", language=None)
-            
-            with tab2:
-                # Display links with index and ID
-                link_data = [f"Index {idx}: {link_id}" for idx, link_id in enumerate(link_names, start=1)]
-                selected_links = st.multiselect(
-                    "Select links to copy indices",
-                    link_data,
-                    key="link_select"
-                )
-                if selected_links:
-                    # Extract indices
-                    indices = []
-                    for item in selected_links:
-                        idx = item.split(':')[0].replace('Index ', '')
-                        indices.append(idx)
-                    indices_str = ','.join(indices)
-                    st.code(indices_str, language=None)
-                    if st.button("Copy Link Indices", key="copy_links"):
-                        st.code(indices_str)
-                else:
-                    # Show all
-                    all_indices = ','.join([str(i) for i in range(1, len(link_names) + 1)])
-                    st.code(f"All link indices: {all_indices}", language=None)
-        except Exception as e:
-            st.error(f"Error showing network info: {e}")
-    
-    # Auto-display network on load or show current plot
-    if not st.session_state.get('update_plot_trigger', False) and not st.session_state.get('plot_ts_trigger', False):
-        if 'auto_plot' not in st.session_state:
-            st.session_state.auto_plot = True
-        try:
-            fig, ax = plt.subplots(figsize=(12, 8))
-            st.session_state.epanet.plot_network_topology(ax=ax, use_epyt_native=False)
-            st.pyplot(fig)
-            plt.close(fig)
-        except Exception:
-            pass
+    render_network_info(stats)
 
 else:
     st.info("👈 Please upload an EPANET .inp file from the sidebar to get started.")
     
     # Show sample files if available
-    samples_dir = Path(__file__).parent.parent / "samples"
-    if samples_dir.exists():
-        sample_files = list(samples_dir.glob("*.inp"))
-        if sample_files:
-            st.subheader("Sample Files Available")
-            for sample_file in sample_files:
-                if st.button(f"Load {sample_file.name}", key=f"load_{sample_file.name}"):
-                    try:
-                        st.session_state.epanet.load_file(sample_file)
-                        st.session_state.file_loaded = True
-                        st.session_state.simulation_run = False
-                        st.success(f"✓ Loaded: {sample_file.name}")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error loading file: {e}")
+    sample_files = dict(_list_samples(str(Path(__file__).parent.parent / "samples")))
+    if sample_files:
+        st.subheader("Sample Files Available")
+        sample_name = st.selectbox("Sample file", list(sample_files), key="sample_select")
+        if st.button("Load Sample", key="load_sample"):
+            try:
+                with _toolkit_lock():
+                    st.session_state.epanet = _wrapper().get_or_build(sample_files[sample_name])
+                st.session_state.loaded_hash = None
+                st.session_state.file_loaded = True
+                st.session_state.simulation_run = st.session_state.epanet.has_simulation_results()
+                st.success(f"✓ Loaded: {sample_name}")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error loading file: {e}")
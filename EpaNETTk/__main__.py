@@ -1,13 +1,116 @@
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import numpy as np
+import queue
+import re
 import sys
+import threading
+from collections import namedtuple
+from functools import partial
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+from epanet_wrapper import EpanetWrapper, get_or_build, preload_dependencies, reset_caches
+
+# Tokens of the comma-separated time series ID entry
+_TS_TOKEN_RE = re.compile(r'[^,\s]+')
+
+
+# Clicked node or link: 1-based EPANET index and ID
+_ElementInfo = namedtuple('ElementInfo', ['index', 'id'])
+
+
+class VirtualListbox(tk.Frame):
+    """
+    Scrollable listbox that only holds the rows currently in view.
+    
+    All lines stay in a Python list and scrolling refills the visible rows,
+    so a list of tens of thousands of IDs opens as fast as a short one.
+    curselection() returns indices into the full list, like tk.Listbox.
+    """
+    
+    def __init__(self, master, lines, **listbox_kw):
+        super().__init__(master)
+        self._lines = lines
+        self._rows = range(len(lines))  # Indices of the lines shown, in order
+        self._top = 0  # Position in _rows of the first visible row
+        self._page = 1  # Number of rows that fit into the listbox
+        self._selected = set()  # Selected line indices, visible or not
+        self._selection = ()  # Sorted _selected, updated on each selection change
+        
+        self._scroll = tk.Scrollbar(self, command=self._on_scrollbar)
+        self._scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        # Rows are written through a Tcl list variable: one set() replaces them all
+        self._items = tk.Variable(self)
+        self._listbox = tk.Listbox(self, listvariable=self._items, exportselection=False,
+                                   **listbox_kw)
+        self._listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._line_height = tkfont.Font(font=self._listbox.cget('font')).metrics('linespace') + 1
+        
+        self._listbox.bind('<Configure>', self._on_resize)
+        self._listbox.bind('<<ListboxSelect>>', self._on_select)
+        self._listbox.bind('<MouseWheel>', lambda e: self._scroll_rows(-3 if e.delta > 0 else 3))
+        self._listbox.bind('<Button-4>', lambda e: self._scroll_rows(-3))
+        self._listbox.bind('<Button-5>', lambda e: self._scroll_rows(3))
+        self._refresh()
+    
+    def set_rows(self, rows):
+        """Show only the lines with the given indices, scrolled to the top."""
+        self._rows = rows
+        self._top = 0
+        self._refresh()
+    
+    def curselection(self):
+        """Indices of the selected lines in the full list (no Tcl call)."""
+        return self._selection
+    
+    def _on_resize(self, event):
+        self._page = max(1, event.height // self._line_height)
+        self._refresh()
+    
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == tk.MOVETO:
+            self._top = int(float(value) * len(self._rows))
+        else:
+            self._top += int(value) * (self._page if unit == tk.PAGES else 1)
+        self._refresh()
+    
+    def _scroll_rows(self, count):
+        self._top += count
+        self._refresh()
+        return 'break'  # The listbox itself has nothing to scroll
+    
+    def _on_select(self, event=None):
+        shown = self._rows[self._top:self._top + self._page]
+        if self._listbox.cget('selectmode') in (tk.BROWSE, tk.SINGLE):
+            self._selected.clear()
+        else:
+            self._selected.difference_update(shown)
+        self._selected.update(shown[pos] for pos in self._listbox.curselection())
+        self._selection = tuple(sorted(self._selected))
+    
+    def _refresh(self):
+        """Refill the listbox with the rows in view and update the scrollbar."""
+        total = len(self._rows)
+        self._top = max(0, min(self._top, total - self._page))
+        shown = self._rows[self._top:self._top + self._page]
+        
+        self._items.set(tuple(self._lines[i] for i in shown))
+        self._listbox.selection_clear(0, tk.END)
+        for pos, i in enumerate(shown):
+            if i in self._selected:
+                self._listbox.selection_set(pos)
+        
+        if total:
+            self._scroll.set(self._top / total, min(1.0, (self._top + self._page) / total))
+        else:
+            self._scroll.set(0.0, 1.0)
 
 
 class EPANETGUI:
@@ -16,10 +119,26 @@ class EPANETGUI:
         self.root.title("EPANET GUI - Network Analysis")
         self.root.geometry("1200x800")
         
-        # Initialize EPANET wrapper
+        # Initialize EPANET wrapper; epyt/NetworkX are warmed up in the background
+        threading.Thread(target=preload_dependencies, daemon=True).start()
         self.epanet = EpanetWrapper()
         self.simulation_run = False
         
+        # Pending after() id of a debounced update_plot, see _schedule_update_plot
+        self._pending_plot = None
+        # Options and data version of the plot currently shown, None if none is
+        self._last_plot_state = None
+        
+        # Outcomes of background work, handed back to the Tk thread by _poll_results
+        self._results = queue.Queue()
+        # True while a worker loads or solves; the toolkit is not thread-safe, so
+        # nothing else may use it meanwhile
+        self._toolkit_busy = False
+        
+        # Wrapper query results, kept until the next load or simulation bumps the version
+        self._cache_version = 0
+        self._memo = {}
+        
         # Create main container
         main_frame = tk.Frame(root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -56,7 +175,7 @@ class EPANETGUI:
         self.info_button.pack(side=tk.LEFT, padx=2)
         self.show_labels_var = tk.BooleanVar(value=False)
         show_labels_cb = tk.Checkbutton(btn_row2, text="Labels", variable=self.show_labels_var,
-                                        command=self.update_plot)
+                                        command=self._schedule_update_plot)
         show_labels_cb.pack(side=tk.LEFT, padx=2)
         
         # Third row: EPyT switch
@@ -64,7 +183,10 @@ class EPANETGUI:
         btn_row3.pack(fill=tk.X, pady=2)
         self.use_epyt_native_var = tk.BooleanVar(value=False)
         tk.Checkbutton(btn_row3, text="EPyT Native", 
-                      variable=self.use_epyt_native_var).pack(anchor=tk.W)
+                      variable=self.use_epyt_native_var).pack(side=tk.LEFT)
+        self.reload_button = tk.Button(btn_row3, text="Reload", command=self.reload_file,
+                                       state=tk.DISABLED, width=8)
+        self.reload_button.pack(side=tk.RIGHT, padx=2)
         
         # Status label (compact)
         self.status_label = tk.Label(toolbox_frame, text="No file loaded.", 
@@ -93,11 +215,11 @@ class EPANETGUI:
         ]
         for text, value in plot_types:
             rb = tk.Radiobutton(viz_frame, text=text, variable=self.plot_type_var, 
-                               value=value, command=self.update_plot, font=("Arial", 9))
+                               value=value, command=self._schedule_update_plot, font=("Arial", 9))
             rb.pack(anchor=tk.W)
         
         # Plot button
-        self.plot_button = tk.Button(viz_frame, text="Update Plot", command=self.update_plot, 
+        self.plot_button = tk.Button(viz_frame, text="Update Plot", command=lambda: self.update_plot(force=True), 
                                     state=tk.DISABLED, width=20)
         self.plot_button.pack(pady=3)
         
@@ -116,6 +238,10 @@ class EPANETGUI:
         self.ts_indices_entry = tk.Entry(ts_frame, width=18, font=("Arial", 9))
         self.ts_indices_entry.pack(pady=2)
         self.ts_indices_entry.insert(0, "J1,J3,J5")
+        # Parsed entry contents; re-read from the widget only after the user edits it
+        self._ts_entry_text = None
+        self._ts_ids = []
+        self._ts_id_set = set()
         tk.Label(ts_frame, text="(e.g., J1,J3)", font=("Arial", 7)).pack(anchor=tk.W)
         
         self.ts_button = tk.Button(ts_frame, text="Plot", command=self.plot_time_series,
@@ -124,75 +250,185 @@ class EPANETGUI:
         
         # === RIGHT PANEL VISUALIZATION ===
         
-        # Matplotlib Figure for Network Visualization
-        self.figure, self.ax = plt.subplots(figsize=(10, 8))
+        # Matplotlib Figure for Network Visualization; standalone, not registered with pyplot
+        self.figure = Figure(figsize=(10, 8))
+        self.ax = self.figure.add_subplot(111)
         # Set fixed margins to prevent canvas shrinking - keep these constant
         self.figure.subplots_adjust(left=0.05, right=0.92, top=0.95, bottom=0.05)
         self.canvas = FigureCanvasTkAgg(self.figure, master=right_panel)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
-        # Store original subplot params to restore after each plot
-        self.original_subplot_params = self.figure.subplotpars
+        # Colorbar axes added next to self.ax by the current plot
+        self._aux_axes = []
         
-        # Store network graph and positions for click detection
+        # Grid slot of the axes within the fixed margins. A colorbar narrows the axes
+        # by re-gridding it, so each plot starts from this slot again.
+        self._ax_spec = self.ax.get_subplotspec()
+        
+        # Store network graph for click detection
         self.network_graph = None
-        self.network_positions = None
-        self.network_node_info = {}  # Store node info (index, ID, etc.)
-        self.network_link_info = {}  # Store link info (index, ID, etc.)
+        # Node IDs, EPANET indices (0 if unknown) and (n_nodes, 2) coordinates,
+        # in the same order, for hit-testing
+        self._node_ids = []
+        self._node_index = np.empty(0, dtype=np.int32)
+        self._node_xy = np.empty((0, 2), dtype=np.float32)
+        # Link IDs in EPANET index order and the row of each ID
+        self._link_ids = ()
+        self._link_id_to_row = {}
+        # Edge segments of shape (n_edges, 2, 2), in network_graph.edges() order
+        self._edge_segs = np.empty((0, 2, 2), dtype=np.float32)
+        # Network the click lookup data above was built for
+        self._click_index_owner = None
         
         # Connect click event
         self.canvas.mpl_connect('button_press_event', self.on_plot_click)
         
         # Annotation for callout
         self.annotation = None
+        
+        # Time series window, figure and canvas, created by the first time series plot
+        self._ts_window = None
+        self._ts_fig = None
+        self._ts_ax = None
+        self._ts_canvas = None
+        
+        # Bitmap of the plot without the callout, so callouts can be blitted on top.
+        # Captured after every full draw (which also covers resizes and plot changes).
+        self._bg = None
+        self.canvas.mpl_connect('draw_event', self._capture_background)
+        self.canvas.mpl_connect('resize_event', self._invalidate_background)
     
     def load_file(self):
         """Load an EPANET input file."""
         file_path = filedialog.askopenfilename(filetypes=[("EPANET Input Files", "*.inp")])
         if file_path:
+            self._open_file(Path(file_path))
+    
+    def reload_file(self):
+        """Reload the current file from disk, discarding cached results."""
+        inp_path = self.epanet.get_file_path()
+        if inp_path is not None:
+            reset_caches()
+            self._open_file(inp_path)
+    
+    def _run_in_background(self, work, on_done, on_error):
+        """
+        Run a blocking call on a worker thread.
+        
+        The worker never touches Tk; its result (or exception) is queued and
+        passed to on_done (or on_error) on the Tk thread by _poll_results.
+        """
+        def worker():
             try:
-                inp_path = Path(file_path)
-                self.epanet.load_file(inp_path)
-                
-                # Update UI
-                file_name = self.epanet.get_file_name()
-                self.status_label.config(text=f"Loaded: {file_name}")
-                self.run_button.config(state=tk.NORMAL)
-                self.plot_button.config(state=tk.NORMAL)
-                self.ts_button.config(state=tk.NORMAL)
-                self.info_button.config(state=tk.NORMAL)
-                self.simulation_run = False
-                
-                # Update statistics
-                self.update_statistics()
-                
-                # Display initial network
-                self.update_plot()
+                self._results.put((on_done, work()))
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to load file: {e}")
+                self._results.put((on_error, e))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(50, self._poll_results)
     
-    def run_simulation(self):
-        """Run the EPANET simulation."""
-        if not self.epanet.is_loaded():
-            messagebox.showerror("Error", "No file selected!")
+    def _poll_results(self):
+        """Deliver one finished background result, or check again shortly."""
+        try:
+            callback, value = self._results.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._poll_results)
             return
+        callback(value)
+    
+    def _set_toolkit_busy(self, busy):
+        """
+        Block or allow every action that uses the EPANET toolkit.
         
+        While a worker loads or solves, the buttons are disabled and plot updates
+        and click callouts are skipped. When allowed again, actions other than
+        Open are only enabled if a network is loaded.
+        """
+        self._toolkit_busy = busy
+        self.load_button.config(state=tk.DISABLED if busy else tk.NORMAL)
+        state = tk.NORMAL if not busy and self.epanet.is_loaded() else tk.DISABLED
+        for button in (self.reload_button, self.run_button, self.plot_button,
+                       self.ts_button, self.info_button):
+            button.config(state=state)
+    
+    def _open_file(self, inp_path):
+        """Parse an input file (or take it from the cache) without blocking the UI."""
+        self._set_toolkit_busy(True)
+        self.status_label.config(text=f"Loading {inp_path.name}...")
+        self._run_in_background(lambda: get_or_build(inp_path),
+                                self._on_file_loaded, self._on_load_error)
+    
+    def _on_file_loaded(self, epanet):
+        """Show a freshly loaded network."""
+        self.epanet = epanet
+        self._cache_version += 1
+        self._set_toolkit_busy(False)
         try:
-            self.status_label.config(text="Running simulation...")
-            self.root.update()
+            # Update UI
+            file_name = self.epanet.get_file_name()
+            self.status_label.config(text=f"Loaded: {file_name}")
+            # A cached network may already have been simulated
+            self.simulation_run = self.epanet.has_simulation_results()
             
-            self.epanet.run_simulation()
-            self.simulation_run = True
-            
-            self.status_label.config(text="Simulation completed!")
-            messagebox.showinfo("Success", "Simulation completed!")
-            
-            # Update statistics and plot
+            # Update statistics
             self.update_statistics()
+            
+            # Display initial network
             self.update_plot()
         except Exception as e:
-            self.status_label.config(text="Simulation failed")
-            messagebox.showerror("Error", f"EPANET Error: {e}")
+            messagebox.showerror("Error", f"Failed to load file: {e}")
+    
+    def _on_load_error(self, error):
+        """Report a failed load and re-enable loading."""
+        self._set_toolkit_busy(False)
+        self.status_label.config(text="Load failed")
+        messagebox.showerror("Error", f"Failed to load file: {error}")
+    
+    def run_simulation(self):
+        """Run the EPANET simulation on a worker thread."""
+        if not self.epanet.is_loaded():
+            messagebox.showerror("Error", "No file selected!")
+            return
+        
+        self._set_toolkit_busy(True)
+        self.status_label.config(text="Running simulation...")
+        epanet = self.epanet
+        self._run_in_background(epanet.run_simulation,
+                                lambda _result: self._on_simulation_done(epanet),
+                                self._on_simulation_error)
+    
+    def _on_simulation_done(self, epanet):
+        """Refresh the UI once the background simulation has finished."""
+        self._set_toolkit_busy(False)
+        if epanet is not self.epanet:
+            return  # Another network was opened meanwhile; its state is unaffected
+        self.simulation_run = True
+        self._cache_version += 1
+        
+        self.status_label.config(text="Simulation completed!")
+        messagebox.showinfo("Success", "Simulation completed!")
+        
+        # Update statistics and plot
+        self.update_statistics()
+        self.update_plot()
+    
+    def _on_simulation_error(self, error):
+        """Report a failed background simulation."""
+        self._set_toolkit_busy(False)
+        self.status_label.config(text="Simulation failed")
+        messagebox.showerror("Error", f"EPANET Error: {error}")
+    
+    def _cached(self, key, fetch):
+        """Return fetch() for key, calling it again only after _cache_version changed."""
+        version, value = self._memo.get(key, (None, None))
+        if version != self._cache_version:
+            value = fetch()
+            self._memo[key] = (self._cache_version, value)
+        return value
+    
+    def _stats(self):
+        """Network statistics of the current network."""
+        return self._cached('stats', self.epanet.get_statistics)
     
     def update_statistics(self):
         """Update the statistics display."""
@@ -200,7 +436,7 @@ class EPANETGUI:
             return
         
         try:
-            stats = self.epanet.get_statistics()
+            stats = self._stats()
             self.stats_text.config(state=tk.NORMAL)
             self.stats_text.delete(1.0, tk.END)
             
@@ -217,64 +453,63 @@ class EPANETGUI:
         except Exception as e:
             pass  # Silently fail if stats not available
     
-    def update_plot(self):
-        """Update the network plot based on selected options."""
-        if not self.epanet.is_loaded():
+    def _schedule_update_plot(self):
+        """
+        Update the plot shortly, coalescing a burst of option changes into one render.
+        
+        Used by the plot type and Labels controls; clicking through several of them
+        quickly renders only the final selection.
+        """
+        if self._pending_plot is not None:
+            self.root.after_cancel(self._pending_plot)
+        self._pending_plot = self.root.after(40, self.update_plot)
+    
+    def update_plot(self, force=False):
+        """
+        Update the network plot based on selected options.
+        
+        Does nothing if the options and data are the same as for the plot already
+        shown, e.g. when an already selected plot type is clicked again.
+        
+        Args:
+            force: Redraw even if nothing changed (the Update Plot button)
+        """
+        if self._pending_plot is not None:
+            # Rendering now; a still-scheduled debounced update would be redundant
+            self.root.after_cancel(self._pending_plot)
+            self._pending_plot = None
+        
+        if not self.epanet.is_loaded() or self._toolkit_busy:
             return
         
+        # _cache_version changes with every load and simulation
+        state = (self.plot_type_var.get(), self.use_epyt_native_var.get(),
+                 self.show_labels_var.get(), self._cache_version)
+        if state == self._last_plot_state and not force:
+            return
+        self._last_plot_state = None
+        
         try:
+            # The network changes, so the cached bitmap is stale until the next draw
+            self._invalidate_background()
+            
             # Clear everything including legends and colorbars
             self.ax.clear()
             
-            # Remove all colorbars and other axes from the figure safely
-            # Also remove any colorbars that might be attached
-            axes_to_remove = []
-            for item in list(self.figure.axes):  # Create a copy of the list
-                if item != self.ax:
-                    axes_to_remove.append(item)
+            # Remove the colorbar axes added by the previous plot
+            for ax_item in self._aux_axes:
+                ax_item.remove()
+            self._aux_axes.clear()
             
-            for ax_item in axes_to_remove:
-                try:
-                    # Remove colorbar if it exists
-                    if hasattr(ax_item, 'colorbar'):
-                        try:
-                            ax_item.colorbar.remove()
-                        except:
-                            pass
-                    ax_item.remove()
-                except (ValueError, AttributeError):
-                    pass  # Already removed or invalid
-            
-            # Restore original subplot parameters to prevent shrinking
-            self.figure.subplots_adjust(left=0.05, right=0.92, top=0.95, bottom=0.05)
+            # Give the axes its full slot back to prevent shrinking
+            self.ax.set_subplotspec(self._ax_spec)
             
             # Remove previous annotation safely
             self.clear_annotation()
             
-            # Build network graph for click detection
-            if not self.use_epyt_native_var.get():
-                self.network_graph, self.network_positions = self.epanet._build_networkx_graph()
-                stats = self.epanet.get_statistics()
-                
-                # Store node info (index, ID mapping)
-                node_names = stats.get('node_names', [])
-                self.network_node_info = {}
-                for idx, node_id in enumerate(node_names, start=1):
-                    if node_id in self.network_positions:
-                        self.network_node_info[node_id] = {
-                            'index': idx,
-                            'id': node_id,
-                            'pos': self.network_positions[node_id]
-                        }
-                
-                # Store link info
-                link_names = stats.get('link_names', [])
-                self.network_link_info = {}
-                for idx, link_id in enumerate(link_names, start=1):
-                    self.network_link_info[link_id] = {
-                        'index': idx,
-                        'id': link_id
-                    }
+            # Build lookup data for click detection once per loaded network
+            if not self.use_epyt_native_var.get() and self._click_index_owner is not self.epanet:
+                self._build_click_index()
             
             plot_type = self.plot_type_var.get()
             use_epyt = self.use_epyt_native_var.get()
@@ -335,34 +570,63 @@ class EPANETGUI:
                     messagebox.showerror("Error", "Quality data not available.")
                     return
             
-            # Force restore fixed margins AFTER plotting to prevent canvas shrinking
-            # This ensures layout stays consistent regardless of colorbars
-            self.figure.subplots_adjust(left=0.05, right=0.92, top=0.95, bottom=0.05)
-            self.canvas.draw()
+            # Remember colorbar axes added by this plot so the next one can remove them
+            self._aux_axes.extend(self.figure.axes[1:])
+            self.canvas.draw_idle()
+            self._last_plot_state = state
         except Exception as e:
             messagebox.showerror("Error", f"Visualization Error: {e}")
     
+    def _build_click_index(self):
+        """Cache the node/link info and coordinate arrays used by on_plot_click."""
+        self.network_graph = self.epanet.get_graph()
+        self._node_ids, self._node_xy, self._edge_segs = self.epanet.get_layout_arrays()
+        stats = self._stats()
+        
+        # Segment start points, directions and squared lengths for point-to-segment distances;
+        # zero-length segments get length 1 so the projection stays at their start point
+        self._seg_start = self._edge_segs[:, 0]
+        self._seg_dir = self._edge_segs[:, 1] - self._edge_segs[:, 0]
+        seg_len_sq = (self._seg_dir**2).sum(axis=1)
+        self._seg_len_sq = np.where(seg_len_sq > 0, seg_len_sq, 1)
+        
+        # Link ID of each segment, in the same order
+        self._edge_link_ids = [link_id for _, _, link_id in self.network_graph.edges(data='link_id')]
+        
+        # EPANET index of each node, parallel to the coordinate array
+        node_names = stats.get('node_names', [])
+        index_of = {node_id: idx for idx, node_id in enumerate(node_names, start=1)}
+        self._node_index = np.fromiter((index_of.get(node_id, 0) for node_id in self._node_ids),
+                                       dtype=np.int32, count=len(self._node_ids))
+        
+        # Link IDs in index order; row + 1 is the EPANET index
+        link_names = stats.get('link_names', [])
+        self._link_ids = tuple(link_names)
+        self._link_id_to_row = {link_id: row for row, link_id in enumerate(self._link_ids)}
+        
+        self._click_index_owner = self.epanet
+    
     def on_plot_click(self, event):
         """Handle click events on the plot to show node/link information."""
-        if not self.epanet.is_loaded():
-            return
+        if not self.epanet.is_loaded() or self._toolkit_busy:
+            return  # Callouts query the toolkit, which a worker may be using
         
         # If clicking outside axes, always clear annotation
         if event.inaxes != self.ax:
             self.clear_annotation()
-            self.canvas.draw()
+            self._blit_overlay()
             return
         
         # If clicking outside plot data area, clear annotation
         if event.xdata is None or event.ydata is None:
             self.clear_annotation()
-            self.canvas.draw()
+            self._blit_overlay()
             return
         
-        if self.use_epyt_native_var.get() or not self.network_positions:
+        if self.use_epyt_native_var.get() or not len(self._node_xy):
             # Even with EPyT native, allow clearing by clicking
             self.clear_annotation()
-            self.canvas.draw()
+            self._blit_overlay()
             return  # Click detection only works with NetworkX plots
         
         try:
@@ -371,16 +635,16 @@ class EPANETGUI:
             # Clear previous annotation first
             self.clear_annotation()
             
-            # Find closest node
+            # Find closest node with one vectorized distance computation
             min_dist = float('inf')
             closest_node = None
             
-            for node_id, info in self.network_node_info.items():
-                node_x, node_y = info['pos']
-                dist = ((click_x - node_x)**2 + (click_y - node_y)**2)**0.5
-                if dist < min_dist:
-                    min_dist = dist
-                    closest_node = info
+            if len(self._node_xy):
+                d2 = ((self._node_xy - np.array([click_x, click_y], dtype=np.float32))**2).sum(axis=1)
+                nearest = int(d2.argmin())
+                min_dist = float(d2[nearest])**0.5
+                if self._node_index[nearest]:
+                    closest_node = _ElementInfo(int(self._node_index[nearest]), self._node_ids[nearest])
             
             # Check if click is close enough to a node (within reasonable distance)
             # Scale threshold based on plot size
@@ -396,63 +660,21 @@ class EPANETGUI:
             closest_link_midpoint = None
             min_link_dist = float('inf')
             
-            if self.network_graph:
-                stats = self.epanet.get_statistics()
-                link_names = stats.get('link_names', [])
-                node_names = stats.get('node_names', [])
+            if self.network_graph and len(self._edge_segs):
+                # Distance from the click to every pipe segment at once
+                click = np.array([click_x, click_y], dtype=np.float32)
+                t = np.clip(((click - self._seg_start) * self._seg_dir).sum(axis=1) / self._seg_len_sq, 0, 1)
+                proj = self._seg_start + t[:, None] * self._seg_dir
+                d2 = ((proj - click)**2).sum(axis=1)
+                nearest = int(d2.argmin())
+                min_link_dist = float(d2[nearest])**0.5
                 
-                for u, v in self.network_graph.edges():
-                    if u in self.network_positions and v in self.network_positions:
-                        x1, y1 = self.network_positions[u]
-                        x2, y2 = self.network_positions[v]
-                        
-                        # Calculate distance from point to line segment
-                        A = x2 - x1
-                        B = y2 - y1
-                        C = x1 - click_x
-                        D = y1 - click_y
-                        
-                        dot = A * C + B * D
-                        len_sq = A * A + B * B
-                        
-                        if len_sq != 0:
-                            param = dot / len_sq
-                            
-                            if param < 0:
-                                xx, yy = x1, y1
-                            elif param > 1:
-                                xx, yy = x2, y2
-                            else:
-                                xx, yy = x1 + param * A, y1 + param * B
-                            
-                            dist = ((click_x - xx)**2 + (click_y - yy)**2)**0.5
-                            
-                            if dist < min_link_dist:
-                                min_link_dist = dist
-                                # Get link info from graph edge data
-                                edge_data = self.network_graph.get_edge_data(u, v, {})
-                                link_id = edge_data.get('link_id', None)
-                                
-                                # If no link_id in edge data, try to find it by matching nodes
-                                if not link_id or link_id not in self.network_link_info:
-                                    # Try to find link that connects these two nodes
-                                    for lid in link_names:
-                                        try:
-                                            link_idx = self.epanet.network.getLinkIndex(lid)
-                                            nodes = self.epanet.network.getLinkNodesIndex(link_idx)
-                                            if len(nodes) >= 2:
-                                                start_node = node_names[nodes[0] - 1]
-                                                end_node = node_names[nodes[1] - 1]
-                                                if (start_node == u and end_node == v) or (start_node == v and end_node == u):
-                                                    link_id = lid
-                                                    break
-                                        except Exception:
-                                            continue
-                                
-                                if link_id and link_id in self.network_link_info:
-                                    link_id_found = link_id
-                                    closest_link = self.network_link_info[link_id]
-                                    closest_link_midpoint = ((x1 + x2) / 2, (y1 + y2) / 2)
+                # Every graph edge carries the ID of its link
+                link_id = self._edge_link_ids[nearest]
+                row = self._link_id_to_row.get(link_id)
+                if row is not None:
+                    closest_link = _ElementInfo(row + 1, link_id)
+                    closest_link_midpoint = tuple(self._edge_segs[nearest].mean(axis=0))
                 
                 # Check if click is close enough to a link (use same threshold)
                 # Only show link if it's closer than node or node wasn't clicked
@@ -469,11 +691,32 @@ class EPANETGUI:
                 self.show_link_callout(closest_link, closest_link_midpoint[0], closest_link_midpoint[1])
             else:
                 # Click not close to any node or link - annotation already cleared above
-                self.canvas.draw()
+                self._blit_overlay()
         
         except Exception as e:
             pass  # Silently handle errors
     
+    def _capture_background(self, event=None):
+        """Cache the freshly drawn plot and put the current callout back on top."""
+        self._bg = self.canvas.copy_from_bbox(self.figure.bbox)
+        if self.annotation is not None:
+            self.ax.draw_artist(self.annotation)
+            self.canvas.blit(self.figure.bbox)
+    
+    def _invalidate_background(self, event=None):
+        """Drop the cached plot bitmap; the next full draw captures a new one."""
+        self._bg = None
+    
+    def _blit_overlay(self):
+        """Show the current callout (or none) without re-rendering the network."""
+        if self._bg is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        if self.annotation is not None:
+            self.ax.draw_artist(self.annotation)
+        self.canvas.blit(self.figure.bbox)
+    
     def clear_annotation(self):
         """Safely remove annotation if it exists."""
         if self.annotation:
@@ -489,21 +732,14 @@ class EPANETGUI:
         # Remove previous annotation
         self.clear_annotation()
         
-        # Get additional info
-        stats = self.epanet.get_statistics()
-        elevations = stats.get('node_elevations', {})
-        elevation = elevations.get(node_info['id'], 'N/A') if isinstance(elevations, dict) else 'N/A'
-        
-        # Get pressure if simulation was run
-        pressure = None
-        if self.simulation_run:
-            pressures = self.epanet.get_node_pressures()
-            if pressures:
-                pressure = pressures.get(node_info['id'], None)
+        # Get elevation, and pressure if simulation was run, of this node only
+        snapshot = self.epanet.get_node_snapshot(node_info.id)
+        elevation = snapshot['elevation']
+        pressure = snapshot['pressure'] if self.simulation_run else None
         
         # Build info text
-        info_text = f"Node Index: {node_info['index']}\n"
-        info_text += f"Node ID: {node_info['id']}\n"
+        info_text = f"Node Index: {node_info.index}\n"
+        info_text += f"Node ID: {node_info.id}\n"
         info_text += f"Elevation: {elevation}"
         if pressure is not None:
             info_text += f"\nPressure: {pressure:.2f}"
@@ -516,40 +752,28 @@ class EPANETGUI:
             textcoords="offset points",
             bbox=dict(boxstyle="round,pad=0.3", facecolor="yellow", alpha=0.8),
             arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=0"),
-            fontsize=9
+            fontsize=9,
+            animated=True  # drawn by _blit_overlay, not part of the cached background
         )
         
         # Update time series entry if it's empty or add to it (use node ID, not index)
-        current_text = self.ts_indices_entry.get().strip()
-        node_id = node_info['id']
-        if not current_text:
-            self.ts_indices_entry.delete(0, tk.END)
-            self.ts_indices_entry.insert(0, node_id)
-        elif self.ts_type_var.get() == 'pressure':
-            # Only update if plotting pressure (nodes)
-            items = [x.strip() for x in current_text.split(',')]
-            if node_id not in items:
-                items.append(node_id)
-                self.ts_indices_entry.delete(0, tk.END)
-                self.ts_indices_entry.insert(0, ','.join(items))
-        
-        self.canvas.draw()
+        # Only add to a non-empty entry if plotting pressure (nodes)
+        if not self._ts_id_list() or self.ts_type_var.get() == 'pressure':
+            self._add_ts_id(node_info.id)
+        
+        self._blit_overlay()
     
     def show_link_callout(self, link_info, x, y):
         """Show callout with link information."""
         # Remove previous annotation
         self.clear_annotation()
         
-        # Get flow if simulation was run
-        flow = None
-        if self.simulation_run:
-            flows = self.epanet.get_link_flows()
-            if flows:
-                flow = flows.get(link_info['id'], None)
+        # Get flow of this link if simulation was run
+        flow = self.epanet.get_link_snapshot(link_info.id)['flow'] if self.simulation_run else None
         
         # Build info text
-        info_text = f"Link Index: {link_info['index']}\n"
-        info_text += f"Link ID: {link_info['id']}"
+        info_text = f"Link Index: {link_info.index}\n"
+        info_text += f"Link ID: {link_info.id}"
         if flow is not None:
             info_text += f"\nFlow: {flow:.2f}"
         
@@ -561,25 +785,39 @@ class EPANETGUI:
             textcoords="offset points",
             bbox=dict(boxstyle="round,pad=0.3", facecolor="lightblue", alpha=0.8),
             arrowprops=dict(arrowstyle="->", connectionstyle="arc3,rad=0"),
-            fontsize=9
+            fontsize=9,
+            animated=True  # drawn by _blit_overlay, not part of the cached background
         )
         
         # Update time series entry if plotting velocity or flow (use link ID, not index)
-        current_text = self.ts_indices_entry.get().strip()
-        ts_type = self.ts_type_var.get()
-        link_id = link_info['id']
-        if ts_type in ['velocity', 'flow']:
-            if not current_text:
-                self.ts_indices_entry.delete(0, tk.END)
-                self.ts_indices_entry.insert(0, link_id)
-            else:
-                items = [x.strip() for x in current_text.split(',')]
-                if link_id not in items:
-                    items.append(link_id)
-                    self.ts_indices_entry.delete(0, tk.END)
-                    self.ts_indices_entry.insert(0, ','.join(items))
+        if self.ts_type_var.get() in ['velocity', 'flow']:
+            self._add_ts_id(link_info.id)
         
-        self.canvas.draw()
+        self._blit_overlay()
+    
+    def _ts_id_list(self):
+        """IDs in the time series entry, parsed again only if the entry text changed."""
+        text = self.ts_indices_entry.get()
+        if text != self._ts_entry_text:
+            self._ts_ids = _TS_TOKEN_RE.findall(text)
+            self._ts_id_set = set(self._ts_ids)
+            self._ts_entry_text = text
+        return self._ts_ids
+    
+    def _add_ts_id(self, item_id):
+        """Append an ID to the time series entry unless it is already listed."""
+        self._ts_id_list()
+        if item_id not in self._ts_id_set:
+            self._ts_ids.append(item_id)
+            self._ts_id_set.add(item_id)
+            self._sync_ts_entry()
+    
+    def _sync_ts_entry(self):
+        """Write the ID list back to the time series entry."""
+        text = ','.join(self._ts_ids)
+        self.ts_indices_entry.delete(0, tk.END)
+        self.ts_indices_entry.insert(0, text)
+        self._ts_entry_text = text
     
     def plot_time_series(self):
         """Plot time series data."""
@@ -591,49 +829,142 @@ class EPANETGUI:
             return
         
         try:
-            # Parse indices or IDs (can be mixed)
-            indices_str = self.ts_indices_entry.get().strip()
-            if indices_str:
-                # Parse as either IDs (strings) or indices (integers)
-                items = []
-                for x in indices_str.split(','):
-                    x = x.strip()
-                    try:
-                        # Try to parse as integer (index)
-                        items.append(int(x))
-                    except ValueError:
-                        # It's a string (ID)
-                        items.append(x)
-                indices = items
-            else:
-                indices = None
-            
             plot_type = self.ts_type_var.get()
             
-            # Create new window for time series
-            ts_window = tk.Toplevel(self.root)
-            ts_window.title(f"Time Series - {plot_type.capitalize()}")
-            ts_window.geometry("800x600")
-            
-            fig, ax = plt.subplots(figsize=(8, 6))
-            canvas = FigureCanvasTkAgg(fig, master=ts_window)
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            
-            # Determine if plotting nodes or links
-            if plot_type == 'pressure':
-                self.epanet.plot_time_series(ax=ax, node_indices=indices, 
-                                           plot_type='pressure', time_unit='hours')
-            elif plot_type == 'velocity':
-                self.epanet.plot_time_series(ax=ax, link_indices=indices,
-                                           plot_type='velocity', time_unit='hours')
-            elif plot_type == 'flow':
-                self.epanet.plot_time_series(ax=ax, link_indices=indices,
-                                           plot_type='flow', time_unit='hours')
-            
-            canvas.draw()
+            # Parse IDs or indices (can be mixed). Callouts write IDs, and networks may use
+            # numeric IDs, so a token is an ID if one exists; all-digit tokens that are not
+            # IDs are 1-based indices
+            kind = 'node' if plot_type == 'pressure' else 'link'
+            valid_ids = self._cached(f'{kind}_id_set',
+                                     lambda: set(self._stats().get(f'{kind}_names', [])))
+            indices, invalid = [], []
+            for token in self._ts_id_list():
+                if token in valid_ids:
+                    indices.append(token)
+                elif token.isdigit() and 1 <= int(token) <= len(valid_ids):
+                    indices.append(int(token))
+                else:
+                    invalid.append(token)
+            
+            # Flag tokens that are neither an ID nor an index before plotting
+            if invalid:
+                messagebox.showwarning("Warning", f"Unknown {kind} IDs/indices: {', '.join(invalid)}")
+                return
+            indices = indices or None
+            
+            # Extract the arrays off the Tk thread; only drawing happens here
+            epanet = self.epanet
+            self._set_toolkit_busy(True)
+            self._run_in_background(lambda: epanet.get_time_series_arrays(plot_type, indices, 'hours'),
+                                    lambda data: self._finish_ts_plot(plot_type, data), self._on_ts_error)
         except Exception as e:
             messagebox.showerror("Error", f"Time series plotting failed: {e}")
     
+    def _ensure_ts_window(self):
+        """Create the time series window on first use; later plots redraw into it."""
+        if self._ts_window is not None and self._ts_window.winfo_exists():
+            return
+        
+        self._ts_window = tk.Toplevel(self.root)
+        self._ts_window.geometry("800x600")
+        self._ts_window.protocol("WM_DELETE_WINDOW", self._close_ts_window)
+        
+        # Standalone figure, not registered with pyplot, so closing the window frees it
+        self._ts_fig = Figure(figsize=(8, 6))
+        self._ts_ax = self._ts_fig.add_subplot(111)
+        self._ts_canvas = FigureCanvasTkAgg(self._ts_fig, master=self._ts_window)
+        self._ts_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    
+    def _close_ts_window(self):
+        """Destroy the time series window and drop its figure."""
+        self._ts_window.destroy()
+        self._ts_window = self._ts_fig = self._ts_ax = self._ts_canvas = None
+    
+    def _finish_ts_plot(self, plot_type, data):
+        """Show extracted time series in the time series window."""
+        self._set_toolkit_busy(False)
+        try:
+            self._ensure_ts_window()
+            self._ts_window.title(f"Time Series - {plot_type.capitalize()}")
+            self._ts_window.lift()
+            
+            self._ts_ax.clear()
+            EpanetWrapper.draw_time_series(self._ts_ax, data)
+            self._ts_canvas.draw_idle()
+        except Exception as e:
+            messagebox.showerror("Error", f"Time series plotting failed: {e}")
+    
+    def _on_ts_error(self, error):
+        """Report a failed time series extraction."""
+        self._set_toolkit_busy(False)
+        messagebox.showerror("Error", f"Time series plotting failed: {error}")
+    
+    def _copy_indices(self, listbox, total, all_indices):
+        """Copy the selected 1-based indices of an ID list, or all of them if none is selected.
+        
+        Args:
+            listbox: VirtualListbox of the Nodes or Links tab
+            total: Number of elements in the list
+            all_indices: Pre-joined string of all indices, used when nothing is selected
+        """
+        selected = listbox.curselection()
+        if selected:
+            indices = ','.join(str(i + 1) for i in selected)
+            count = len(selected)
+        else:
+            indices, count = all_indices, total
+        self._set_clipboard(indices)
+        self._notify_copied(count, indices)
+    
+    def _set_clipboard(self, text):
+        """Replace the clipboard contents and let Tk hand them over to the system."""
+        root = self.root
+        root.clipboard_clear()
+        root.clipboard_append(text)
+        # Some platforms only publish the new clipboard once the event loop has run
+        root.update()
+    
+    def _notify_copied(self, count, preview):
+        """Confirm a clipboard copy without handing the whole index string to the dialog."""
+        if len(preview) > 80:
+            preview = f"{preview[:80]}..."
+        messagebox.showinfo("Copied", f"Copied {count} indices (first: {preview})")
+    
+    def _make_id_list(self, parent, names):
+        """
+        Create a filter entry and a VirtualListbox of "Index i: ID" lines.
+        
+        Typing in the entry shows only IDs containing the text (case-insensitive).
+        Filtering waits until typing pauses for 150 ms, then refills the list once.
+        
+        Returns:
+            The VirtualListbox
+        """
+        filter_var = tk.StringVar()
+        tk.Entry(parent, textvariable=filter_var, width=50).pack(fill=tk.X, pady=(0, 2))
+        listbox = VirtualListbox(parent, list(map("Index {}: {}".format, range(1, len(names) + 1), names)),
+                                 width=50)
+        listbox.pack(fill=tk.BOTH, expand=True)
+        
+        folded = [item_id.casefold() for item_id in names]
+        job = None
+        
+        def apply_filter():
+            nonlocal job
+            job = None
+            text = filter_var.get().strip().casefold()
+            listbox.set_rows([i for i, item_id in enumerate(folded) if text in item_id]
+                             if text else range(len(names)))
+        
+        def schedule_filter(*args):
+            nonlocal job
+            if job is not None:
+                listbox.after_cancel(job)
+            job = listbox.after(150, apply_filter)
+        
+        filter_var.trace_add('write', schedule_filter)
+        return listbox
+    
     def show_network_info(self):
         """Show network information (node and link IDs) in a separate window."""
         if not self.epanet.is_loaded():
@@ -641,9 +972,14 @@ class EPANETGUI:
             return
         
         try:
-            stats = self.epanet.get_statistics()
+            stats = self._stats()
             node_names = stats.get('node_names', [])
             link_names = stats.get('link_names', [])
+            # "1,2,...,n" strings for copying all indices, built once per network
+            all_node_indices = self._cached('all_node_indices',
+                                            lambda: ','.join(map(str, range(1, len(node_names) + 1))))
+            all_link_indices = self._cached('all_link_indices',
+                                            lambda: ','.join(map(str, range(1, len(link_names) + 1))))
             
             # Create info window
             info_window = tk.Toplevel(self.root)
@@ -658,74 +994,32 @@ class EPANETGUI:
             node_frame = tk.Frame(notebook)
             notebook.add(node_frame, text=f"Nodes ({len(node_names)})")
             
-            node_scroll = tk.Scrollbar(node_frame)
-            node_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            node_listbox = tk.Listbox(node_frame, yscrollcommand=node_scroll.set, width=50)
-            node_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            node_scroll.config(command=node_listbox.yview)
-            
-            # Add nodes with index and ID
-            for idx, node_id in enumerate(node_names, start=1):
-                node_listbox.insert(tk.END, f"Index {idx}: {node_id}")
+            # Nodes with index and ID, with a filter entry above
+            node_listbox = self._make_id_list(node_frame, node_names)
             
             # Add copy button for nodes
-            def copy_node_ids():
-                selected = node_listbox.curselection()
-                if selected:
-                    indices = [str(i + 1) for i in selected]
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(','.join(indices))
-                    messagebox.showinfo("Copied", f"Copied indices: {','.join(indices)}")
-                else:
-                    # Copy all indices
-                    all_indices = ','.join([str(i) for i in range(1, len(node_names) + 1)])
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(all_indices)
-                    messagebox.showinfo("Copied", f"Copied all node indices: {all_indices}")
-            
             node_copy_btn = tk.Button(node_frame, text="Copy Selected/All Indices", 
-                                     command=copy_node_ids)
+                                     command=partial(self._copy_indices, node_listbox,
+                                                     len(node_names), all_node_indices))
             node_copy_btn.pack(pady=5)
             
             # Link IDs tab
             link_frame = tk.Frame(notebook)
             notebook.add(link_frame, text=f"Links ({len(link_names)})")
             
-            link_scroll = tk.Scrollbar(link_frame)
-            link_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            link_listbox = tk.Listbox(link_frame, yscrollcommand=link_scroll.set, width=50)
-            link_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            link_scroll.config(command=link_listbox.yview)
-            
-            # Add links with index and ID
-            for idx, link_id in enumerate(link_names, start=1):
-                link_listbox.insert(tk.END, f"Index {idx}: {link_id}")
+            # Links with index and ID, with a filter entry above
+            link_listbox = self._make_id_list(link_frame, link_names)
             
             # Add copy button for links
-            def copy_link_ids():
-                selected = link_listbox.curselection()
-                if selected:
-                    indices = [str(i + 1) for i in selected]
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(','.join(indices))
-                    messagebox.showinfo("Copied", f"Copied indices: {','.join(indices)}")
-                else:
-                    # Copy all indices
-                    all_indices = ','.join([str(i) for i in range(1, len(link_names) + 1)])
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(all_indices)
-                    messagebox.showinfo("Copied", f"Copied all link indices: {all_indices}")
-            
             link_copy_btn = tk.Button(link_frame, text="Copy Selected/All Indices", 
-                                     command=copy_link_ids)
+                                     command=partial(self._copy_indices, link_listbox,
+                                                     len(link_names), all_link_indices))
             link_copy_btn.pack(pady=5)
             
             # Instructions
             instructions = tk.Label(info_window, 
                                    text="Select items and click Copy to get indices for time series plotting.\n"
-                                        "If nothing selected, copies all indices.",
+                                        "If nothing selected, copies all indices. Type above a list to filter it.",
                                    font=("Arial", 9), justify=tk.LEFT)
             instructions.pack(pady=5)
             
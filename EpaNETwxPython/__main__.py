@@ -7,15 +7,20 @@ This module provides a wxPython-based GUI for EPANET network analysis.
 import wx
 from pathlib import Path
 import sys
+import threading
 import matplotlib
 matplotlib.use('WXAgg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
-from matplotlib.figure import Figure
 
-# Add parent directory to path to import epanet_wrapper
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from epanet_wrapper import EpanetWrapper
+# epanet_wrapper sits next to the package; with `python -m` it is already importable,
+# so the parent directory is only appended for direct script runs (e.g. streamlit run)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+
+def _wrapper():
+    """Import the wrapper module (and with it numpy) on first use, not before the frame shows."""
+    import epanet_wrapper
+    return epanet_wrapper
 
 
 class NetworkPlotPanel(wx.Panel):
@@ -23,19 +28,45 @@ class NetworkPlotPanel(wx.Panel):
     
     def __init__(self, parent):
         super().__init__(parent)
+        # Figure and canvas are created on first plot to keep startup light;
+        # a text placeholder fills the panel until then
+        self.figure = None
+        self.ax = None
+        self.canvas = None
+        # Wrapper whose network is on the canvas; the plot only needs redrawing for another one
+        self._plotted = None
+        self.SetSizer(wx.BoxSizer(wx.VERTICAL))
+        self._placeholder = wx.StaticText(self, label="Load an .inp file to display the network.")
+        self.GetSizer().Add(self._placeholder, 1, wx.ALIGN_CENTER | wx.ALL, 10)
+    
+    def _ensure_canvas(self):
+        """Create the matplotlib figure and canvas on first use."""
+        if self.canvas is not None:
+            return
+        
+        from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        
+        self._placeholder.Destroy()
         self.figure = Figure(figsize=(6, 4))
+        # One persistent axes, cleared and redrawn by each plot
+        self.ax = self.figure.add_subplot(111)
         self.canvas = FigureCanvas(self, -1, self.figure)
-        sizer = wx.BoxSizer(wx.VERTICAL)
-        sizer.Add(self.canvas, 1, wx.EXPAND)
-        self.SetSizer(sizer)
+        self.GetSizer().Add(self.canvas, 1, wx.EXPAND)
+        self.Layout()
     
     def plot_network(self, epanet_wrapper):
-        """Plot the network using the epanet wrapper."""
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
+        """Plot the network using the epanet wrapper, unless it is already shown."""
+        if epanet_wrapper is self._plotted:
+            return
+        
+        self._ensure_canvas()
+        self._plotted = None
         try:
-            epanet_wrapper.plot_network(ax=ax)
-            self.canvas.draw()
+            # plot_network() clears the axes itself
+            epanet_wrapper.plot_network(ax=self.ax)
+            self._plotted = epanet_wrapper
+            self.canvas.draw_idle()
         except Exception as e:
             wx.MessageBox(f"Visualization error: {e}", "Error", wx.OK | wx.ICON_ERROR)
 
@@ -45,7 +76,10 @@ class EpanetWxApp(wx.Frame):
     
     def __init__(self):
         super().__init__(None, title="EPANET wxPython GUI", size=(800, 600))
-        self.epanet = EpanetWrapper()
+        # Import the wrapper and warm up epyt/matplotlib in the background while the frame is shown
+        threading.Thread(target=lambda: _wrapper().preload_dependencies(), daemon=True).start()
+        # Set by the first load
+        self.epanet = None
         self.init_ui()
     
     def init_ui(self):
@@ -54,9 +88,15 @@ class EpanetWxApp(wx.Frame):
         vbox = wx.BoxSizer(wx.VERTICAL)
         
         # Load file button
-        load_btn = wx.Button(panel, label="Load .inp File")
-        load_btn.Bind(wx.EVT_BUTTON, self.load_file)
-        vbox.Add(load_btn, 0, wx.ALL | wx.EXPAND, 5)
+        self.load_btn = wx.Button(panel, label="Load .inp File")
+        self.load_btn.Bind(wx.EVT_BUTTON, self.load_file)
+        vbox.Add(self.load_btn, 0, wx.ALL | wx.EXPAND, 5)
+        
+        # Reload file button (re-reads the file from disk)
+        self.reload_btn = wx.Button(panel, label="Reload")
+        self.reload_btn.Bind(wx.EVT_BUTTON, self.reload_file)
+        self.reload_btn.Enable(False)
+        vbox.Add(self.reload_btn, 0, wx.ALL | wx.EXPAND, 5)
         
         # Run simulation button
         self.run_btn = wx.Button(panel, label="Run Simulation")
@@ -84,28 +124,60 @@ class EpanetWxApp(wx.Frame):
                 return
             
             file_path = fileDialog.GetPath()
-            try:
-                inp_path = Path(file_path)
-                self.epanet.load_file(inp_path)
-                
-                file_name = self.epanet.get_file_name()
-                self.status_label.SetLabel(f"Loaded: {file_name}")
-                self.run_btn.Enable(True)
-                self.plot_panel.plot_network(self.epanet)
-            except Exception as e:
-                wx.MessageBox(f"Failed to load file: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            self._open_file(Path(file_path))
+    
+    def reload_file(self, event):
+        """Reload the current file from disk, discarding cached results."""
+        inp_path = self.epanet.get_file_path() if self.epanet is not None else None
+        if inp_path is not None:
+            _wrapper().reset_caches()
+            self._open_file(inp_path)
+    
+    def _open_file(self, inp_path):
+        """Show the (possibly cached) network of an input file."""
+        try:
+            self.epanet = _wrapper().get_or_build(inp_path)
+            
+            file_name = self.epanet.get_file_name()
+            self.status_label.SetLabel(f"Loaded: {file_name}")
+            self.run_btn.Enable(True)
+            self.reload_btn.Enable(True)
+            self.plot_panel.plot_network(self.epanet)
+        except Exception as e:
+            wx.MessageBox(f"Failed to load file: {e}", "Error", wx.OK | wx.ICON_ERROR)
     
     def run_simulation(self, event):
-        """Run the EPANET simulation."""
-        if not self.epanet.is_loaded():
+        """Run the EPANET simulation on a worker thread."""
+        if self.epanet is None or not self.epanet.is_loaded():
             wx.MessageBox("No file loaded!", "Warning", wx.OK | wx.ICON_WARNING)
             return
         
+        # get_or_build() must not load another network into the toolkit mid-solve
+        self.load_btn.Enable(False)
+        self.reload_btn.Enable(False)
+        self.run_btn.Enable(False)
+        self.status_label.SetLabel("Running simulation...")
+        threading.Thread(target=self._do_simulation, args=(self.epanet,), daemon=True).start()
+    
+    def _do_simulation(self, epanet):
+        """Worker thread: run the solver and hand the outcome back to the GUI thread."""
         try:
-            self.epanet.run_simulation()
-            wx.MessageBox("Simulation completed!", "Success", wx.OK | wx.ICON_INFORMATION)
+            epanet.run_simulation()
+            error = None
         except Exception as e:
-            wx.MessageBox(f"Simulation error: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            error = e
+        wx.CallAfter(self._on_simulation_done, epanet, error)
+    
+    def _on_simulation_done(self, epanet, error):
+        """Report the simulation outcome (GUI thread)."""
+        self.load_btn.Enable(True)
+        self.reload_btn.Enable(True)
+        self.run_btn.Enable(True)
+        self.status_label.SetLabel(f"Loaded: {epanet.get_file_name()}")
+        if error is None:
+            wx.MessageBox("Simulation completed!", "Success", wx.OK | wx.ICON_INFORMATION)
+        else:
+            wx.MessageBox(f"Simulation error: {error}", "Error", wx.OK | wx.ICON_ERROR)
 
 
 def main():
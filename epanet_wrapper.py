@@ -8,19 +8,91 @@ The visualization system uses NetworkX for proper graph representation, accounti
 - 3D network topology (nodes with X, Y, elevation coordinates)
 - Simulation results mapping (pressures, flows, velocities)
 - Proper network graph visualization with connections
+
+epyt, matplotlib and NetworkX are imported on first use so that GUIs can show
+their window before paying for these imports (see preload_dependencies()).
 """
 
+from __future__ import annotations
+
+import functools
+import hashlib
+import mmap
+import shutil
+import tempfile
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
-from epyt import epanet
-import matplotlib.pyplot as plt
-import networkx as nx
+from typing import BinaryIO, Callable, Optional, Dict, List, Tuple, Union, TYPE_CHECKING
 import numpy as np
 
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+def preload_dependencies() -> None:
+    """
+    Import the EPANET toolkit and plotting dependencies used by EpanetWrapper.
+    
+    Intended to be run on a background thread at GUI startup so that the first
+    file load or plot does not have to wait for these imports.
+    """
+    import epyt
+    import matplotlib.pyplot
+    import networkx
+
+
+# Networks with more pipes than this are drawn with a coordinate-binned subsample
+LOD_EDGE_THRESHOLD = 20000
+# Number of grid cells per axis used when binning pipe endpoints
+LOD_GRID_SIZE = 1024
+
+# epyt drives a single global EPANET project, so only the wrapper that loaded a
+# file last can query the toolkit; the others re-open their file first
+_toolkit_owner: Optional['EpanetWrapper'] = None
+
+# Keyword arguments always passed through to epyt's plot()
+_EPYT_PLOT_PARAMS = frozenset({'nodesID', 'linksID', 'nodesindex', 'linksindex',
+                               'highlightlink', 'highlightnode', 'point', 'line',
+                               'legend', 'title'})
+# plot_network_attributes() also passes 'colorbar' ...
+_EPYT_ATTRIBUTE_PLOT_PARAMS = _EPYT_PLOT_PARAMS | {'colorbar'}
+# ... but never its own options
+_ATTRIBUTE_PLOT_OPTIONS = frozenset({'pressure_text', 'flow_text', 'hour'})
+
+
+def _epyt_plot_kwargs(kwargs: Dict, valid: frozenset = _EPYT_PLOT_PARAMS,
+                      skip: frozenset = frozenset()) -> Dict:
+    """
+    Select the keyword arguments to pass on to epyt's plot().
+    
+    Valid epyt parameters are always kept; other boolean values (wrapper flags like
+    show_pressures) are dropped, while other non-boolean values are passed on.
+    
+    Args:
+        kwargs: Keyword arguments given to a plotting method
+        valid: Names of the epyt parameters to keep
+        skip: Names that are never passed on
+    
+    Returns:
+        Dictionary of keyword arguments for epyt's plot()
+    """
+    if not kwargs:
+        return {}
+    return {key: value for key, value in kwargs.items()
+            if key in valid or (key not in skip and not isinstance(value, bool))}
+
 
 class EpanetWrapper:
     """Wrapper class for EPANET operations using Pathlib."""
     
+    # Fixed attribute set: no per-instance __dict__ for the many wrappers kept by get_or_build()
+    __slots__ = (
+        'inp_file', 'network',
+        '_statistics', '_node_idx', '_link_idx',
+        '_computed_time_series', '_sim_results', '_sim_averages', '_element_results', '_time_axes',
+        '_network_graph', '_edge_link_rows', '_node_pos', '_node_xy', '_node_coords', '_edge_segments',
+        '_file_hash', '_spooled_file', '_sim_method', '_node_getters', '_edge_lod', '_standalone_ax',
+    )
+    
     def __init__(self, inp_file: Optional[Path] = None):
         """
         Initialize the EPANET wrapper.
@@ -30,24 +102,66 @@ class EpanetWrapper:
         """
         self.inp_file: Optional[Path] = None
         self.network = None
-        self._statistics: Optional[Dict] = None
+        # Network statistics read so far; fields are fetched on first request
+        self._statistics: Dict = {}
+        # 1-based EPANET index of each node/link ID, built with the statistics
+        self._node_idx: Optional[Dict[str, int]] = None
+        self._link_idx: Optional[Dict[str, int]] = None
         self._computed_time_series: Optional[Dict] = None
+        # Time-averaged (node_pressures, link_flows) of _computed_time_series
+        self._sim_results: Optional[Tuple[Optional[Dict], Optional[Dict]]] = None
+        # The same averages as arrays in EPANET index order
+        self._sim_averages: Optional[Tuple[Optional[np.ndarray], Optional[np.ndarray]]] = None
+        # Result arrays of _computed_time_series transposed to (elements, time steps)
+        self._element_results: Dict[str, np.ndarray] = {}
+        # Time axis of _computed_time_series per unit ('hours' or 'seconds')
+        self._time_axes: Dict[str, np.ndarray] = {}
+        self._network_graph: Optional[nx.Graph] = None
+        # 0-based link index of each edge, in G.edges() order
+        self._edge_link_rows: Optional[np.ndarray] = None
+        # Node positions as a float64 (n_nodes, 2) array in G.nodes() order;
+        # the _node_xy dictionary is only built when get_layout() asks for it
+        self._node_pos: Optional[np.ndarray] = None
+        self._node_xy: Optional[Dict] = None
+        self._node_coords: Optional[np.ndarray] = None
+        self._edge_segments: Optional[np.ndarray] = None
+        self._file_hash: Optional[str] = None
+        self._spooled_file: Optional[Path] = None
+        # Name of the toolkit method run_simulation() uses, resolved on load
+        self._sim_method: Optional[str] = None
+        # getNode* toolkit method per attribute name, see get_node_attribute()
+        self._node_getters: Dict[str, Optional[Callable]] = {}
+        self._edge_lod: Optional[Tuple] = None
+        # (axes, original subplot spec) of the last plot drawn without a given axes
+        self._standalone_ax: Optional[Tuple] = None
         
         if inp_file:
             self.load_file(inp_file)
     
-    def load_file(self, inp_file: Path) -> None:
+    def load_file(self, inp_file: Union[Path, BinaryIO], name: Optional[str] = None) -> None:
         """
         Load an EPANET input file.
         
+        EPANET opens input files by path, so a binary stream (e.g. an HTTP upload)
+        is copied to a temporary file in chunks rather than read into memory.
+        
         Args:
-            inp_file: Path to the .inp file
+            inp_file: Path to the .inp file, or a binary file-like object
+            name: File name to use for a file-like source (e.g. 'net.inp')
             
         Raises:
             FileNotFoundError: If the file doesn't exist
             ValueError: If the file is not a .inp file
         """
-        inp_path = Path(inp_file)
+        global _toolkit_owner
+        spooled = None
+        if hasattr(inp_file, 'read'):
+            inp_path = Path(name or getattr(inp_file, 'name', None) or 'network.inp')
+            if inp_path.suffix.lower() != '.inp':
+                raise ValueError(f"File must be a .inp file, got: {inp_path.suffix}")
+            inp_path = spooled = self._spool_to_temp(inp_file, inp_path.name)
+        else:
+            inp_path = Path(inp_file)
         
         if not inp_path.exists():
             raise FileNotFoundError(f"File not found: {inp_path}")
@@ -55,27 +169,138 @@ class EpanetWrapper:
         if inp_path.suffix.lower() != '.inp':
             raise ValueError(f"File must be a .inp file, got: {inp_path.suffix}")
         
+        try:
+            self._open_network(inp_path)
+        except Exception:
+            if spooled is not None:
+                shutil.rmtree(spooled.parent, ignore_errors=True)
+            # The failed open may have dropped the previous project; re-open it on next use
+            if _toolkit_owner is self:
+                _toolkit_owner = None
+            raise
+        
+        # The previous upload's copy is only deleted once the new file has loaded
+        if self._spooled_file is not None and self._spooled_file != inp_path:
+            self._remove_spooled_file()
+        if spooled is not None:
+            self._spooled_file = spooled
         self.inp_file = inp_path
+        self._sim_method = next((name for name in self._SIMULATION_METHODS
+                                 if hasattr(self.network, name)), None)
+        # Drop the results and layout of the previously loaded network
+        self._computed_time_series = None
+        self._sim_results = None
+        self._sim_averages = None
+        self._element_results = {}
+        self._time_axes = {}
+        self._network_graph = None
+        self._edge_link_rows = None
+        self._node_pos = None
+        self._node_xy = None
+        self._node_coords = None
+        self._edge_segments = None
+        self._file_hash = None
+        self._edge_lod = None
+        # Read the element counts while the toolkit is known to hold this network;
+        # the other statistics of the new network are read when first requested
+        self._statistics = {}
+        self._node_idx = None
+        self._link_idx = None
+        for field in ('node_count', 'link_count'):
+            try:
+                self._statistic(field)
+            except Exception:
+                pass  # Left to _update_statistics()
+    
+    def _open_network(self, inp_path: Path) -> None:
+        """Open a file in the toolkit and record this wrapper as the one it holds."""
+        global _toolkit_owner
+        from epyt import epanet
+        
         self.network = epanet(str(inp_path))
-        # Load and store statistics
-        self._update_statistics()
+        # Getters are bound to the previous toolkit object
+        self._node_getters = {}
+        _toolkit_owner = self
+    
+    def is_current(self) -> bool:
+        """
+        Check whether the toolkit holds this wrapper's network.
+        
+        Returns:
+            True if a file is loaded and no other wrapper loaded a file since
+        """
+        return self.network is not None and _toolkit_owner is self
+    
+    def _ensure_current(self) -> None:
+        """Re-open this wrapper's file if another wrapper loaded a file into the toolkit since."""
+        if self.network is not None and _toolkit_owner is not self:
+            self._open_network(self.inp_file)
+    
+    def _spool_to_temp(self, stream: BinaryIO, file_name: str) -> Path:
+        """
+        Copy a binary stream to a private temporary directory in chunks.
+        
+        Args:
+            stream: Binary file-like object to copy
+            file_name: Name of the file created in the temporary directory
+            
+        Returns:
+            Path to the temporary copy
+        """
+        temp_path = Path(tempfile.mkdtemp(prefix='epanet_')) / file_name
+        try:
+            with temp_path.open('wb') as f:
+                shutil.copyfileobj(stream, f, 1 << 20)
+        except Exception:
+            shutil.rmtree(temp_path.parent, ignore_errors=True)
+            raise
+        return temp_path
+    
+    def _remove_spooled_file(self) -> None:
+        """Delete the temporary copy made for a stream source, if any."""
+        if self._spooled_file is not None:
+            shutil.rmtree(self._spooled_file.parent, ignore_errors=True)
+            self._spooled_file = None
+    
+    # Statistics field -> epyt method that reads it
+    _STATISTIC_GETTERS = {
+        'node_count': 'getNodeCount',
+        'link_count': 'getLinkCount',
+        'node_elevations': 'getNodeElevations',
+        'node_names': 'getNodeNameID',
+        'link_names': 'getLinkNameID',
+        'node_coordinates': 'getNodeCoordinates',
+    }
+    
+    def _statistic(self, field: str):
+        """
+        Get one network statistic, reading it from the toolkit on first request.
+        
+        Args:
+            field: Statistics field (a key of _STATISTIC_GETTERS)
+        
+        Returns:
+            The stored value of the field
+            
+        Raises:
+            Exception: Whatever the toolkit raises if the value cannot be read
+        """
+        if field not in self._statistics:
+            # Another wrapper may have loaded its file into the toolkit since
+            self._ensure_current()
+            self._statistics[field] = getattr(self.network, self._STATISTIC_GETTERS[field])()
+        return self._statistics[field]
     
     def _update_statistics(self) -> None:
-        """Update and store network statistics."""
+        """Read and store all network statistics not read yet."""
         if self.network is None:
             return
         
-        try:
-            self._statistics = {
-                'node_count': self.network.getNodeCount(),
-                'link_count': self.network.getLinkCount(),
-                'node_elevations': self.network.getNodeElevations(),
-                'node_names': self.network.getNodeNameID(),
-                'link_names': self.network.getLinkNameID(),
-                'node_coordinates': self.network.getNodeCoordinates(),
-            }
-        except Exception:
-            self._statistics = {}
+        for field in self._STATISTIC_GETTERS:
+            try:
+                self._statistic(field)
+            except Exception:
+                pass  # Leave fields that cannot be read out of the statistics
     
     def get_statistics(self) -> Dict:
         """
@@ -84,53 +309,103 @@ class EpanetWrapper:
         Returns:
             Dictionary containing network statistics (node_count, link_count, elevations, etc.)
         """
-        if self._statistics is None:
-            self._update_statistics()
-        return self._statistics.copy() if self._statistics else {}
+        self._update_statistics()
+        return self._statistics.copy()
+    
+    def _id_table(self, kind: str) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Get the IDs of all nodes or links and a lookup of their EPANET indices.
+        
+        Both are built once per loaded file from the statistics, so ID lookups
+        do not query the toolkit or scan the ID list.
+        
+        Args:
+            kind: 'Node' or 'Link'
+        
+        Returns:
+            Tuple of (IDs in index order, dictionary mapping ID to 1-based index)
+        """
+        if kind == 'Node':
+            names = self._statistic('node_names')
+            if self._node_idx is None:
+                self._node_idx = {name: i for i, name in enumerate(names, start=1)}
+            return names, self._node_idx
+        names = self._statistic('link_names')
+        if self._link_idx is None:
+            self._link_idx = {name: i for i, name in enumerate(names, start=1)}
+        return names, self._link_idx
     
-    def run_simulation(self) -> None:
+    # Toolkit methods that run the hydraulic simulation, in order of preference;
+    # getNodePressure() is the last resort that triggers it by accessing results
+    _SIMULATION_METHODS = ('getComputedTimeSeries', 'runCompleteSimulation', 'solveCompleteHydraulics',
+                           'solveH', 'runHydraulics', 'getNodePressure')
+    
+    def run_simulation(self, force: bool = False) -> None:
         """
         Run the hydraulic simulation.
         
         In epyt, getComputedTimeSeries() runs the simulation automatically.
         This method triggers the simulation and stores the results.
+        Results are kept until another file is loaded, so repeated calls
+        return immediately unless force is set.
+        
+        Args:
+            force: Re-run the solver even if results are already available
         
         Raises:
             RuntimeError: If no file is loaded or simulation fails
         """
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        if self._computed_time_series is not None and not force:
+            return
+        
+        self._sim_results = None
+        self._sim_averages = None
+        self._element_results = {}
+        self._time_axes = {}
+        if self._sim_method is None:
+            available_methods = [m for m in dir(self.network) 
+                               if any(kw in m.lower() for kw in ['solve', 'run', 'hydraulic', 'complete', 'simulation', 'computed'])
+                               and not m.startswith('_')]
+            raise RuntimeError(
+                f"Simulation method not found. "
+                f"Available simulation-related methods: {', '.join(available_methods) if available_methods else 'none found'}."
+            )
         
         try:
-            # In epyt, getComputedTimeSeries() runs the simulation automatically
-            # This is the recommended way per EPyT examples
-            self._computed_time_series = self.network.getComputedTimeSeries()
-        except AttributeError:
-            # Fallback: try other methods
-            try:
-                if hasattr(self.network, 'runCompleteSimulation'):
-                    self.network.runCompleteSimulation()
-                elif hasattr(self.network, 'solveCompleteHydraulics'):
-                    self.network.solveCompleteHydraulics()
-                elif hasattr(self.network, 'solveH'):
-                    self.network.solveH()
-                elif hasattr(self.network, 'runHydraulics'):
-                    self.network.runHydraulics()
-                else:
-                    # Try to trigger simulation by accessing results
-                    _ = self.network.getNodePressure()
-            except Exception as e:
-                available_methods = [m for m in dir(self.network) 
-                                   if any(kw in m.lower() for kw in ['solve', 'run', 'hydraulic', 'complete', 'simulation', 'computed'])
-                                   and not m.startswith('_')]
-                raise RuntimeError(
-                    f"Simulation method not found. "
-                    f"Available simulation-related methods: {', '.join(available_methods) if available_methods else 'none found'}. "
-                    f"Error: {e}"
-                ) from e
+            if self._sim_method == 'getComputedTimeSeries':
+                # In epyt, getComputedTimeSeries() runs the simulation automatically
+                # This is the recommended way per EPyT examples
+                self._computed_time_series = self._contiguous_results(self.network.getComputedTimeSeries())
+            else:
+                # Fallback for toolkit versions without it
+                getattr(self.network, self._sim_method)()
         except Exception as e:
             raise RuntimeError(f"Simulation failed: {e}") from e
     
+    @staticmethod
+    def _contiguous_results(res):
+        """
+        Store the result arrays of a computed time series in C (row-major) order.
+        
+        Done once when results are stored so that the time reductions and column
+        slices made by the plot and snapshot methods read memory sequentially.
+        
+        Args:
+            res: Computed time series returned by getComputedTimeSeries()
+        
+        Returns:
+            The same object, with its result arrays made C-contiguous
+        """
+        for attr in ('Time', 'Pressure', 'Flow', 'Velocity', 'Quality', 'Demand', 'Head'):
+            values = getattr(res, attr, None)
+            if isinstance(values, np.ndarray):
+                setattr(res, attr, np.ascontiguousarray(values))
+        return res
+    
     def get_network(self):
         """
         Get the EPANET network object.
@@ -146,133 +421,407 @@ class EpanetWrapper:
         
         return self.network
     
-    def _build_networkx_graph(self) -> Tuple[nx.Graph, Dict]:
+    def _build_networkx_graph(self) -> Tuple[nx.Graph, np.ndarray]:
         """
         Build a NetworkX graph from the EPANET network with 3D coordinates.
         
         Returns:
-            Tuple of (NetworkX graph, position dictionary with node coordinates)
+            Tuple of (NetworkX graph, node positions of shape (n_nodes, 2) in G.nodes() order)
             
         Raises:
             RuntimeError: If network data cannot be retrieved
         """
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        import networkx as nx
         
         G = nx.Graph()
-        pos = {}
         
         try:
-            # Get node coordinates (X, Y, elevation - 3D coordinates)
+            # Get node coordinates (X, Y, elevation - 3D coordinates);
+            # epyt returns {'x': {index: x}, 'y': {index: y}, ...} with 1-based indices
             node_coords = self.network.getNodeCoordinates()
-            node_names = self.network.getNodeNameID()
+            node_names, _ = self._id_table('Node')
+            count = len(node_names)
+            xs, ys = node_coords.get('x') or {}, node_coords.get('y') or {}
             
-            # Add nodes with coordinates
-            for idx, node_id in enumerate(node_names, start=1):
-                if node_id in node_coords:
-                    x, y = node_coords[node_id][:2]  # X, Y coordinates
-                    pos[node_id] = (x, y)
-                    G.add_node(node_id)
-                else:
-                    # Fallback: use node index if coordinates not available
-                    pos[node_id] = (idx * 10, idx * 10)
-                    G.add_node(node_id)
+            # Add nodes with coordinates, one row per node in index order
+            G.add_nodes_from(node_names)
+            pos = np.empty((count, 2))
+            pos[:, 0] = np.fromiter((xs.get(i, np.nan) for i in range(1, count + 1)), dtype=float, count=count)
+            pos[:, 1] = np.fromiter((ys.get(i, np.nan) for i in range(1, count + 1)), dtype=float, count=count)
+            # Fallback: use node index if coordinates not available
+            missing = np.isnan(pos).any(axis=1)
+            pos[missing] = np.arange(1, count + 1)[missing, None] * 10.0
             
-            # Get link connections with proper mapping
-            link_names = self.network.getLinkNameID()
-            for link_id in link_names:
-                try:
-                    # Get start and end nodes for each link
-                    link_index = self.network.getLinkIndex(link_id)
-                    nodes = self.network.getLinkNodesIndex(link_index)
-                    if len(nodes) >= 2:
-                        start_node = node_names[nodes[0] - 1]  # epyt uses 1-based indexing
-                        end_node = node_names[nodes[1] - 1]
-                        # Store link_id in edge data for easy retrieval
-                        G.add_edge(start_node, end_node, link_id=link_id)
-                except Exception:
-                    continue  # Skip links that can't be processed
+            # Get link connections with proper mapping: start and end node indices
+            # of all links from a single toolkit call, in link index order
+            link_names, _ = self._id_table('Link')
+            conn = np.asarray(self.network.getNodesConnectingLinksIndex(), dtype=np.intp).reshape(-1, 2) - 1
+            # epyt uses 1-based indexing; translate both columns to node IDs at once
+            ends = np.asarray(node_names, dtype=object)[conn]
+            # Store link_id in edge data for easy retrieval
+            G.add_edges_from((start_node, end_node, {'link_id': link_id})
+                             for link_id, (start_node, end_node) in zip(link_names, ends.tolist()))
             
         except Exception as e:
             raise RuntimeError(f"Failed to build network graph: {e}") from e
         
         return G, pos
     
+    def precompute_layout(self) -> None:
+        """
+        Build the network graph and node positions once and cache them.
+        
+        Subsequent plot_network() calls reuse the cached layout instead of
+        rebuilding it from the EPANET network on every redraw.
+        
+        Raises:
+            RuntimeError: If no file is loaded or the graph cannot be built
+        """
+        self._network_graph, self._node_pos = self._build_networkx_graph()
+        self._node_xy = None
+        # Graph edges are not in link order, so link results are mapped through this
+        _, link_idx = self._id_table('Link')
+        self._edge_link_rows = np.fromiter(
+            (link_idx[link_id] - 1 for _, _, link_id in self._network_graph.edges(data='link_id')),
+            dtype=np.intp, count=self._network_graph.number_of_edges())
+        self._node_coords, self._edge_segments = self._layout_arrays(self._network_graph, self._node_pos)
+    
+    def get_graph(self) -> nx.Graph:
+        """
+        Get the cached network graph (link IDs are stored as the 'link_id' edge attribute).
+        
+        The layout is computed with precompute_layout() if it is not cached yet.
+        
+        Returns:
+            NetworkX graph of the network
+            
+        Raises:
+            RuntimeError: If no file is loaded or the graph cannot be built
+        """
+        if self.network is None:
+            raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        if self._network_graph is None:
+            self.precompute_layout()
+        return self._network_graph
+    
+    def get_layout(self) -> Tuple[nx.Graph, Dict]:
+        """
+        Get the cached network graph and node positions.
+        
+        The layout is computed with precompute_layout() if it is not cached yet.
+        The position dictionary is built from the position array on first request.
+        
+        Returns:
+            Tuple of (NetworkX graph, position dictionary with node coordinates)
+            
+        Raises:
+            RuntimeError: If no file is loaded or the graph cannot be built
+        """
+        G = self.get_graph()
+        if self._node_xy is None:
+            self._node_xy = dict(zip(G.nodes(), map(tuple, self._node_pos.tolist())))
+        return G, self._node_xy
+    
+    def get_layout_arrays(self) -> Tuple[List, np.ndarray, np.ndarray]:
+        """
+        Get the cached layout as arrays, for GUIs that draw the network natively.
+        
+        The layout is computed with precompute_layout() if it is not cached yet.
+        
+        Returns:
+            Tuple of (node IDs, node coordinates of shape (n_nodes, 2),
+            edge segments of shape (n_edges, 2, 2)), nodes in the same order
+            
+        Raises:
+            RuntimeError: If no file is loaded or the graph cannot be built
+        """
+        G = self.get_graph()
+        return list(G.nodes()), self._node_coords, self._edge_segments
+    
+    @staticmethod
+    def _layout_arrays(G: nx.Graph, pos: Union[Dict, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pack node positions and pipe endpoints into float32 arrays for drawing.
+        
+        Args:
+            G: NetworkX graph of the network
+            pos: Position dictionary mapping node IDs to (x, y) coordinates,
+                or an (n_nodes, 2) array in G.nodes() order
+        
+        Returns:
+            Tuple of (node coordinates of shape (n_nodes, 2) in G.nodes() order,
+            edge segments of shape (n_edges, 2, 2) in G.edges() order)
+        """
+        if isinstance(pos, dict):
+            pos = [pos[node] for node in G.nodes()]
+        node_coords = np.asarray(pos, dtype=np.float32).reshape(-1, 2)
+        # Row of each edge's end nodes, then gather both endpoints in one indexing step
+        row = {node: i for i, node in enumerate(G.nodes())}
+        ends = np.fromiter((row[node] for edge in G.edges() for node in edge),
+                           dtype=np.intp, count=2 * G.number_of_edges()).reshape(-1, 2)
+        return node_coords, node_coords[ends]
+    
+    @staticmethod
+    def _decimate_segments(segs: np.ndarray, xlim: Tuple[float, float], ylim: Tuple[float, float],
+                           grid: int = LOD_GRID_SIZE) -> np.ndarray:
+        """
+        Select a subsample of edge segments for drawing at the given view limits.
+        
+        Segments outside the view are dropped. If more than LOD_EDGE_THRESHOLD remain,
+        their endpoints are binned into a grid x grid raster of the view and only
+        one segment is kept per pair of start/end cells.
+        
+        Args:
+            segs: Edge segments of shape (n_edges, 2, 2)
+            xlim: Current x-axis limits of the view
+            ylim: Current y-axis limits of the view
+            grid: Number of grid cells per axis
+        
+        Returns:
+            Sorted indices of the segments to draw
+        """
+        x0, x1 = sorted(xlim)
+        y0, y1 = sorted(ylim)
+        sx, sy = segs[:, :, 0], segs[:, :, 1]
+        visible = ((sx.max(axis=1) >= x0) & (sx.min(axis=1) <= x1) &
+                   (sy.max(axis=1) >= y0) & (sy.min(axis=1) <= y1))
+        idx = np.flatnonzero(visible)
+        if len(idx) <= LOD_EDGE_THRESHOLD:
+            return idx
+        
+        cell = np.array([max(x1 - x0, 1e-9), max(y1 - y0, 1e-9)]) / grid
+        cells = np.floor_divide(segs[idx] - np.array([x0, y0]), cell).astype(np.int32)
+        _, keep = np.unique(cells.reshape(len(idx), 4), axis=0, return_index=True)
+        return idx[np.sort(keep)]
+    
+    @staticmethod
+    def _draw_network(ax, node_ids, node_coords: np.ndarray, segs: np.ndarray,
+                      node_colors='lightblue', node_cmap=None, node_norm=None,
+                      edge_colors='gray', edge_cmap=None):
+        """
+        Draw pipes as a single LineCollection and nodes as a single scatter.
+        
+        Labels are plain text artists at the node coordinates; no NetworkX
+        drawing function is involved.
+        
+        Networks with more than LOD_EDGE_THRESHOLD pipes only draw a binned
+        subsample of the pipes visible in the initial view.
+        
+        Args:
+            ax: Matplotlib axes object to draw on
+            node_ids: Node IDs used as labels, in node_coords order
+            node_coords: Node coordinates from _layout_arrays()
+            segs: Edge segments from _layout_arrays()
+            node_colors: Single color, or list or array of values (one per node)
+            node_cmap: Colormap used when node_colors holds values
+            node_norm: Normalization of node_colors values (optional, autoscaled if not given)
+            edge_colors: Single color, or list or array of values (one per edge)
+            edge_cmap: Colormap used when edge_colors holds values
+        
+        Returns:
+            The LineCollection holding the pipes
+        """
+        from matplotlib.collections import LineCollection
+        
+        has_values = isinstance(node_colors, (list, np.ndarray))
+        ax.scatter(node_coords[:, 0], node_coords[:, 1], c=node_colors, s=300, alpha=0.9,
+                   cmap=node_cmap if has_values else None, norm=node_norm if has_values else None,
+                   zorder=2)
+        ax.update_datalim(node_coords)
+        ax.autoscale_view()
+        
+        keep = slice(None)
+        if len(segs) > LOD_EDGE_THRESHOLD:
+            keep = EpanetWrapper._decimate_segments(segs, ax.get_xlim(), ax.get_ylim())
+        
+        lc = LineCollection(segs[keep], linewidths=2, alpha=0.6, zorder=1)
+        if isinstance(edge_colors, (list, np.ndarray)):
+            lc.set_array(np.asarray(edge_colors)[keep])
+            lc.set_cmap(edge_cmap)
+        else:
+            lc.set_color(edge_colors)
+        ax.add_collection(lc, autolim=False)
+        
+        # Add node labels
+        for node, (x, y) in zip(node_ids, node_coords.tolist()):
+            ax.text(x, y, str(node), size=8, weight='bold',
+                    horizontalalignment='center', verticalalignment='center', clip_on=True)
+        return lc
+    
+    def update_edge_lod(self, ax) -> None:
+        """
+        Re-select the pipes drawn by the last plot_network() call for the current view.
+        
+        Intended to be connected to the axes' 'xlim_changed'/'ylim_changed' callbacks
+        so that zooming into a large network reveals the pipes dropped at low zoom.
+        Does nothing for networks below LOD_EDGE_THRESHOLD pipes.
+        
+        Args:
+            ax: Matplotlib axes the network was plotted on
+        """
+        if self._edge_lod is None:
+            return
+        lc, segs, values = self._edge_lod
+        if lc.axes is not ax:
+            return  # Axes was cleared or replaced since the network was drawn
+        
+        keep = self._decimate_segments(segs, ax.get_xlim(), ax.get_ylim())
+        lc.set_segments(segs[keep])
+        if values is not None:
+            lc.set_array(values[keep])
+    
+    def _element_major(self, attr: str) -> Optional[np.ndarray]:
+        """
+        Get a computed result array with one contiguous row per node or link.
+        
+        The computed time series is (time steps, elements); the transposed copy is
+        made once per attribute and cached, so averages over time and per-element
+        series read each element's values sequentially. The copy is float32, which
+        is plenty for plotting and halves the memory the reductions stream through;
+        the computed time series itself keeps its original dtype.
+        
+        Args:
+            attr: Result attribute of the computed time series ('Pressure', 'Flow', ...)
+        
+        Returns:
+            float32 array of shape (n_elements, n_time_steps), or None if not simulated
+        """
+        values = self._element_results.get(attr)
+        if values is None:
+            values = getattr(self._computed_time_series, attr, None)
+            if values is None:
+                return None
+            # A single time step comes as a 1D array: treat it as one column
+            values = np.ascontiguousarray(np.atleast_2d(np.asarray(values)).T, dtype=np.float32)
+            self._element_results[attr] = values
+        return values
+    
+    @staticmethod
+    def _row_means(values) -> np.ndarray:
+        """
+        Average each element's values from a direct toolkit query.
+        
+        Args:
+            values: One value per element, or a 2D array with one row of values per element
+        
+        Returns:
+            1D float array with one value per element
+        """
+        values = np.asarray(values, dtype=float)
+        return values.mean(axis=1) if values.ndim > 1 else values.ravel()
+    
+    def _simulation_averages(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Get time-averaged node pressures and link flows as arrays in EPANET index order.
+        
+        Averages of the computed time series are cached until the simulation is
+        re-run or another file is loaded; without one, the toolkit is queried directly.
+        
+        Returns:
+            Tuple of (node pressures, link flows); either is None if not available
+        """
+        if self._sim_averages is not None:
+            return self._sim_averages
+        
+        pressures, flows = None, None
+        # Try to get results from computed time series first (more reliable)
+        res = self.get_computed_time_series()
+        if res is not None:
+            # Use average across all time steps, or first time step if only one;
+            # accumulate in float64 so long simulations do not lose precision
+            if getattr(res, 'Pressure', None) is not None:
+                pressures = self._element_major('Pressure').mean(axis=1, dtype=np.float64)
+            if getattr(res, 'Flow', None) is not None:
+                flows = self._element_major('Flow').mean(axis=1, dtype=np.float64)
+            self._sim_averages = (pressures, flows)
+            return self._sim_averages
+        
+        # Fallback: Try direct methods
+        self._ensure_current()
+        try:
+            values = self.network.getNodePressure()
+            if values is not None:
+                pressures = self._row_means(values)
+        except Exception:
+            pass
+        try:
+            values = self.network.getLinkFlows()
+            if values is not None:
+                flows = self._row_means(values)
+        except Exception:
+            pass
+        return pressures, flows
+    
     def _get_simulation_results(self) -> Tuple[Optional[Dict], Optional[Dict]]:
         """
         Get simulation results for visualization (pressures, flows).
         
+        Results averaged from the computed time series are cached until the
+        simulation is re-run or another file is loaded.
+        
         Returns:
             Tuple of (node_pressures dict, link_flows dict) or (None, None) if simulation not run
         """
         if self.network is None:
             return None, None
+        if self._sim_results is not None:
+            return self._sim_results
         
         try:
-            # Try to get results from computed time series first (more reliable)
-            res = self.get_computed_time_series()
-            node_pressures = {}
-            link_flows = {}
-            
-            if res is not None:
-                # Get node names and link names
-                node_names = self.network.getNodeNameID()
-                link_names = self.network.getLinkNameID()
-                
-                # Extract pressures from time series (use first time step or average)
-                if hasattr(res, 'Pressure') and res.Pressure is not None:
-                    # Use average across all time steps, or first time step if only one
-                    if len(res.Pressure.shape) > 1:
-                        pressures_avg = np.mean(res.Pressure, axis=0)
-                    else:
-                        pressures_avg = res.Pressure
-                    
-                    for idx, node_id in enumerate(node_names):
-                        if idx < len(pressures_avg):
-                            node_pressures[node_id] = float(pressures_avg[idx])
-                
-                # Extract flows from time series
-                if hasattr(res, 'Flow') and res.Flow is not None:
-                    if len(res.Flow.shape) > 1:
-                        flows_avg = np.mean(res.Flow, axis=0)
-                    else:
-                        flows_avg = res.Flow
-                    
-                    for idx, link_id in enumerate(link_names):
-                        if idx < len(flows_avg):
-                            link_flows[link_id] = float(flows_avg[idx])
-                
-                return node_pressures if node_pressures else None, link_flows if link_flows else None
-            
-            # Fallback: Try direct methods
-            node_names = self.network.getNodeNameID()
-            try:
-                pressures = self.network.getNodePressure()
-                if pressures is not None:
-                    for idx, node_id in enumerate(node_names):
-                        if idx < len(pressures):
-                            pressure_values = pressures[idx] if isinstance(pressures[idx], (list, np.ndarray)) else [pressures[idx]]
-                            node_pressures[node_id] = np.mean(pressure_values) if len(pressure_values) > 0 else 0.0
-            except Exception:
-                pass
+            pressures, flows = self._simulation_averages()
+            # zip() stops at the shorter sequence; tolist() yields Python floats
+            node_pressures = link_flows = None
+            if pressures is not None:
+                node_pressures = dict(zip(self._id_table('Node')[0], pressures.tolist())) or None
+            if flows is not None:
+                link_flows = dict(zip(self._id_table('Link')[0], flows.tolist())) or None
             
-            link_names = self.network.getLinkNameID()
-            try:
-                flows = self.network.getLinkFlows()
-                if flows is not None:
-                    for idx, link_id in enumerate(link_names):
-                        if idx < len(flows):
-                            flow_values = flows[idx] if isinstance(flows[idx], (list, np.ndarray)) else [flows[idx]]
-                            link_flows[link_id] = np.mean(flow_values) if len(flow_values) > 0 else 0.0
-            except Exception:
-                pass
-            
-            return node_pressures if node_pressures else None, link_flows if link_flows else None
+            if self._sim_averages is not None:
+                # Averages came from the computed time series; keep the dicts too
+                self._sim_results = (node_pressures, link_flows)
+            return node_pressures, link_flows
             
         except Exception as e:
             return None, None
     
-    def plot_network(self, ax=None, show_pressures: bool = False, show_flows: bool = False):
+    def _standalone_axes(self, figsize: Tuple[float, float]):
+        """
+        Get an axes for a plot drawn without a caller-provided axes.
+        
+        The axes of the previous such plot is cleared and reused while its figure
+        is still open, so repeated calls do not create a new figure each time.
+        
+        Args:
+            figsize: Figure size used when a new figure has to be created
+        
+        Returns:
+            Matplotlib axes object
+        """
+        import matplotlib.pyplot as plt
+        
+        if self._standalone_ax is not None:
+            ax, spec = self._standalone_ax
+            if plt.fignum_exists(ax.figure.number):
+                # Drop colorbars of the previous plot and give the axes its full area back
+                for other in ax.figure.axes:
+                    if other is not ax:
+                        other.remove()
+                ax.set_subplotspec(spec)
+                ax.clear()
+                return ax
+        
+        fig, ax = plt.subplots(figsize=figsize)
+        self._standalone_ax = (ax, ax.get_subplotspec())
+        return ax
+    
+    def plot_network(self, ax=None, show_pressures: bool = False, show_flows: bool = False,
+                     pos: Optional[Dict] = None, node_values: Optional[np.ndarray] = None,
+                     node_cmap=None, node_label: str = 'Value', title: Optional[str] = None,
+                     rasterized: bool = False):
         """
         Plot the network visualization using NetworkX.
         
@@ -285,6 +834,14 @@ class EpanetWrapper:
             ax: Matplotlib axes object (optional). If provided, the plot will be drawn on this axes.
             show_pressures: If True, color nodes by pressure values (requires simulation to be run)
             show_flows: If True, color edges by flow values (requires simulation to be run)
+            pos: Node positions (optional). Defaults to the layout cached by precompute_layout().
+            node_values: Values to color nodes by, one per node in EPANET index order (optional).
+                Takes precedence over show_pressures.
+            node_cmap: Colormap for node_values (default viridis)
+            node_label: Colorbar label for node_values
+            title: Plot title (optional). Defaults to one describing the shown results.
+            rasterized: If True, pipes are drawn as one bitmap in vector output (PDF/SVG)
+                instead of a path per pipe
             
         Raises:
             RuntimeError: If no file is loaded or plotting fails
@@ -292,68 +849,76 @@ class EpanetWrapper:
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
         
+        import matplotlib.pyplot as plt
+        
         try:
-            # Build NetworkX graph with 3D coordinates
-            G, pos = self._build_networkx_graph()
+            # Reuse the cached NetworkX graph with 3D coordinates
+            if self._network_graph is None:
+                self.precompute_layout()
+            G = self._network_graph
+            if pos is None:
+                node_coords, segs = self._node_coords, self._edge_segments
+            else:
+                node_coords, segs = self._layout_arrays(G, pos)
             
             if ax is not None:
                 ax.clear()
                 
-                # Get simulation results if requested
-                node_pressures, link_flows = None, None
+                # Get simulation results if requested, as arrays in EPANET index order
+                pressures, flows = None, None
                 if show_pressures or show_flows:
-                    node_pressures, link_flows = self._get_simulation_results()
+                    pressures, flows = self._simulation_averages()
                 
-                # Prepare node colors based on pressures
-                node_colors = None
-                if show_pressures and node_pressures:
-                    node_colors = [node_pressures.get(node, 0.0) for node in G.nodes()]
-                    if node_colors and all(c == 0.0 for c in node_colors):
-                        node_colors = 'lightblue'  # Fallback if no pressure data
-                else:
-                    node_colors = 'lightblue'
+                # Prepare node colors from the given values or pressures; graph nodes are in
+                # index order, so the arrays are used as they are
+                if node_values is None and show_pressures and pressures is not None and pressures.any():
+                    node_values, node_cmap, node_label = pressures, plt.cm.viridis, 'Pressure'
+                # 'lightblue' is also the fallback if no pressure data
+                node_colors = 'lightblue' if node_values is None else np.asarray(node_values)
+                node_cmap = node_cmap or plt.cm.viridis
+                # Value range computed once, shared by the node scatter and the colorbar
+                node_norm = None
+                if isinstance(node_colors, np.ndarray) and node_colors.size:
+                    node_norm = plt.Normalize(vmin=node_colors.min(), vmax=node_colors.max())
                 
-                # Prepare edge colors based on flows
-                edge_colors = None
-                if show_flows and link_flows:
-                    edge_colors = []
-                    for u, v, data in G.edges(data=True):
-                        link_id = data.get('link_id', '')
-                        edge_colors.append(link_flows.get(link_id, 0.0))
-                    if edge_colors and all(c == 0.0 for c in edge_colors):
+                # Prepare edge colors based on flows, mapped from link order to edge order
+                edge_colors = 'gray'
+                if show_flows and flows is not None:
+                    edge_colors = flows[self._edge_link_rows]
+                    if not edge_colors.any():
                         edge_colors = 'gray'  # Fallback if no flow data
-                else:
-                    edge_colors = 'gray'
                 
-                # Draw the network using NetworkX
+                # Draw the network as one edge collection and one node scatter
                 # Use node coordinates for positioning (preserves 3D spatial layout)
-                nx.draw_networkx_nodes(G, pos, ax=ax, node_color=node_colors,
-                                      node_size=300, alpha=0.9, cmap=plt.cm.viridis if show_pressures and isinstance(node_colors, list) else None)
-                
-                nx.draw_networkx_edges(G, pos, ax=ax, edge_color=edge_colors,
-                                      width=2, alpha=0.6, 
-                                      edge_cmap=plt.cm.plasma if show_flows and isinstance(edge_colors, list) else None)
-                
-                # Add node labels
-                nx.draw_networkx_labels(G, pos, ax=ax, font_size=8, font_weight='bold')
+                lc = self._draw_network(ax, G.nodes(), node_coords, segs,
+                                        node_colors=node_colors, node_cmap=node_cmap,
+                                        node_norm=node_norm, edge_colors=edge_colors,
+                                        edge_cmap=plt.cm.plasma if show_flows else None)
+                lc.set_rasterized(rasterized)
+                # Keep the full pipe set so update_edge_lod() can re-bin it on zoom
+                self._edge_lod = None
+                if len(segs) > LOD_EDGE_THRESHOLD:
+                    values = edge_colors if isinstance(edge_colors, np.ndarray) else None
+                    self._edge_lod = (lc, segs, values)
                 
                 ax.set_aspect('equal', adjustable='box')
                 ax.axis('off')
-                ax.set_title('EPANET Network' + 
-                           (' (Pressures)' if show_pressures else '') +
-                           (' (Flows)' if show_flows else ''))
+                ax.set_title(title or ('EPANET Network' + 
+                                       (' (Pressures)' if show_pressures else '') +
+                                       (' (Flows)' if show_flows else '')))
                 
-                # Add colorbar if showing simulation results
-                if show_pressures and isinstance(node_colors, list) and node_colors:
-                    sm = plt.cm.ScalarMappable(cmap=plt.cm.viridis, 
-                                             norm=plt.Normalize(vmin=min(node_colors), vmax=max(node_colors)))
+                # Add colorbar if nodes are colored by values
+                if node_norm is not None:
+                    sm = plt.cm.ScalarMappable(cmap=node_cmap, norm=node_norm)
                     sm.set_array([])
-                    plt.colorbar(sm, ax=ax, label='Pressure')
+                    ax.figure.colorbar(sm, ax=ax, label=node_label)
                 
             else:
-                # No axes provided, create a new figure
-                fig, ax = plt.subplots(figsize=(10, 8))
-                self.plot_network(ax=ax, show_pressures=show_pressures, show_flows=show_flows)
+                # No axes provided, reuse the previous standalone figure if it is still open
+                ax = self._standalone_axes(figsize=(10, 8))
+                self.plot_network(ax=ax, show_pressures=show_pressures, show_flows=show_flows, pos=pos,
+                                  node_values=node_values, node_cmap=node_cmap, node_label=node_label,
+                                  title=title, rasterized=rasterized)
                 plt.show()
                 
         except Exception as e:
@@ -379,6 +944,38 @@ class EpanetWrapper:
         """
         return self.inp_file
     
+    def get_file_hash(self) -> Optional[str]:
+        """
+        Get a content hash of the loaded file, usable as a cache key for renders.
+        
+        The file is memory-mapped and hashed on first request, so its pages are
+        read in by the OS as needed, and the digest is kept until another file
+        is loaded.
+        
+        Returns:
+            Hex digest of the file contents or None if no file is loaded
+        """
+        if self.inp_file is None:
+            return None
+        if self._file_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            with self.inp_file.open('rb') as f:
+                # Empty files cannot be memory-mapped
+                if self.inp_file.stat().st_size > 0:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        digest.update(mm)
+            self._file_hash = digest.hexdigest()
+        return self._file_hash
+    
+    def has_simulation_results(self) -> bool:
+        """
+        Check if simulation results are available for the loaded file.
+        
+        Returns:
+            True if run_simulation() has stored results, False otherwise
+        """
+        return self._computed_time_series is not None
+    
     def is_loaded(self) -> bool:
         """
         Check if a file is currently loaded.
@@ -388,25 +985,124 @@ class EpanetWrapper:
         """
         return self.network is not None
     
-    def get_node_pressures(self) -> Optional[Dict[str, float]]:
+    def get_node_pressures(self, stat: str = 'mean') -> Optional[Dict[str, float]]:
         """
         Get node pressures from simulation results.
         
+        Args:
+            stat: Reduction over time: 'mean' (default), 'min', 'max' or 'std'
+        
         Returns:
-            Dictionary mapping node IDs to average pressure values, or None if simulation not run
+            Dictionary mapping node IDs to pressure values, or None if simulation not run
+            
+        Raises:
+            ValueError: If stat is unknown
         """
-        node_pressures, _ = self._get_simulation_results()
-        return node_pressures
+        if stat == 'mean':
+            node_pressures, _ = self._get_simulation_results()
+            return node_pressures
+        return self._result_stat('Pressure', 'Node', stat)
     
-    def get_link_flows(self) -> Optional[Dict[str, float]]:
+    def get_link_flows(self, stat: str = 'mean') -> Optional[Dict[str, float]]:
         """
         Get link flows from simulation results.
         
+        Args:
+            stat: Reduction over time: 'mean' (default), 'min', 'max' or 'std'
+        
+        Returns:
+            Dictionary mapping link IDs to flow values, or None if simulation not run
+            
+        Raises:
+            ValueError: If stat is unknown
+        """
+        if stat == 'mean':
+            _, link_flows = self._get_simulation_results()
+            return link_flows
+        return self._result_stat('Flow', 'Link', stat)
+    
+    def _result_stat(self, attr: str, kind: str, stat: str) -> Optional[Dict[str, float]]:
+        """
+        Reduce a computed result over time for every node or link.
+        
+        Args:
+            attr: Result attribute of the computed time series ('Pressure', 'Flow', ...)
+            kind: 'Node' or 'Link'
+            stat: 'min', 'max' or 'std'
+        
         Returns:
-            Dictionary mapping link IDs to average flow values, or None if simulation not run
+            Dictionary mapping IDs to values, or None if simulation not run
+            
+        Raises:
+            ValueError: If stat is unknown
+        """
+        if stat not in ('min', 'max', 'std'):
+            raise ValueError(f"Unknown stat: {stat}. Use 'mean', 'min', 'max', or 'std'")
+        if self.network is None or self.get_computed_time_series() is None:
+            return None
+        values = self._element_major(attr)
+        if values is None:
+            return None
+        
+        # One contiguous row per element, so each reduction streams through memory once
+        if stat == 'std':
+            reduced = values.std(axis=1, dtype=np.float64)
+        else:
+            reduced = getattr(values, stat)(axis=1)
+        names, _ = self._id_table(kind)
+        return dict(zip(names, reduced.tolist()))
+    
+    def get_node_snapshot(self, node_id: str) -> Dict:
         """
-        _, link_flows = self._get_simulation_results()
-        return link_flows
+        Get the elevation and average pressure of a single node.
+        
+        Reads only the requested node, instead of building dicts for the whole
+        network like get_node_elevations() and get_node_pressures().
+        
+        Args:
+            node_id: Node ID
+        
+        Returns:
+            Dictionary with 'elevation' and 'pressure' (None if simulation not run)
+            
+        Raises:
+            RuntimeError: If no file is loaded
+        """
+        if self.network is None:
+            raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        idx = self.network.getNodeIndex(node_id)
+        return {
+            'elevation': float(self.network.getNodeElevations(idx)),
+            'pressure': self._average_result('Pressure', idx),
+        }
+    
+    def get_link_snapshot(self, link_id: str) -> Dict:
+        """
+        Get the average flow of a single link.
+        
+        Args:
+            link_id: Link ID
+        
+        Returns:
+            Dictionary with 'flow' (None if simulation not run)
+            
+        Raises:
+            RuntimeError: If no file is loaded
+        """
+        if self.network is None:
+            raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        return {'flow': self._average_result('Flow', self.network.getLinkIndex(link_id))}
+    
+    def _average_result(self, attr: str, idx: int) -> Optional[float]:
+        """Average over time of one element's simulation result, or None if not simulated."""
+        values = self._element_major(attr)
+        if values is None:
+            return None
+        return float(values[idx - 1].mean(dtype=np.float64))
     
     def get_computed_time_series(self) -> Optional[Dict]:
         """
@@ -417,7 +1113,8 @@ class EpanetWrapper:
         """
         if self._computed_time_series is None:
             try:
-                self._computed_time_series = self.network.getComputedTimeSeries()
+                self._ensure_current()
+                self._computed_time_series = self._contiguous_results(self.network.getComputedTimeSeries())
             except Exception:
                 return None
         return self._computed_time_series
@@ -441,27 +1138,18 @@ class EpanetWrapper:
         """
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        import matplotlib.pyplot as plt
         
         if use_epyt_native:
             # Use epyt's native plotting (as in EX5 example)
             # Note: epyt.plot() creates its own figure, so we can't use custom axes
             try:
                 # Filter kwargs - epyt.plot() has specific parameter names
-                # Remove any kwargs that might cause issues
-                plot_kwargs = {}
-                valid_epyt_params = ['nodesID', 'linksID', 'nodesindex', 'linksindex', 
-                                    'highlightlink', 'highlightnode', 'point', 'line', 
-                                    'legend', 'title', 'colorbar']
-                
-                for key, value in kwargs.items():
-                    # Only pass valid epyt parameters
-                    if key in valid_epyt_params:
-                        plot_kwargs[key] = value
-                    # Skip boolean values that aren't in valid list (like pressure_text, flow_text)
-                    elif not isinstance(value, bool):
-                        # Allow non-boolean values that might be valid
-                        if key not in ['pressure_text', 'flow_text', 'hour']:
-                            plot_kwargs[key] = value
+                # Remove any kwargs that might cause issues (like pressure_text, flow_text)
+                plot_kwargs = _epyt_plot_kwargs(kwargs, _EPYT_ATTRIBUTE_PLOT_PARAMS,
+                                                _ATTRIBUTE_PLOT_OPTIONS)
                 
                 if attribute == 'elevation':
                     elevations = self.network.getNodeElevations()
@@ -501,28 +1189,16 @@ class EpanetWrapper:
         else:
             # Use NetworkX plotting (our custom implementation)
             if attribute == 'elevation':
-                self.plot_network(ax=ax, show_pressures=False, show_flows=False)
-                # Override with elevation colors
-                stats = self.get_statistics()
-                if 'node_elevations' in stats and ax:
-                    G, pos = self._build_networkx_graph()
-                    elevations = stats['node_elevations']
-                    node_colors = [elevations.get(node, 0.0) if isinstance(elevations, dict) 
-                                 else elevations[i] if i < len(elevations) else 0.0
-                                 for i, node in enumerate(G.nodes())]
-                    ax.clear()
-                    nx.draw_networkx_nodes(G, pos, ax=ax, node_color=node_colors,
-                                          node_size=300, alpha=0.9, cmap=plt.cm.Oranges)
-                    nx.draw_networkx_edges(G, pos, ax=ax, edge_color='gray', width=2, alpha=0.6)
-                    nx.draw_networkx_labels(G, pos, ax=ax, font_size=8, font_weight='bold')
-                    ax.set_aspect('equal', adjustable='box')
-                    ax.axis('off')
-                    ax.set_title('EPANET Network - Elevations')
-                    if isinstance(node_colors, list) and node_colors:
-                        sm = plt.cm.ScalarMappable(cmap=plt.cm.Oranges,
-                                                 norm=plt.Normalize(vmin=min(node_colors), vmax=max(node_colors)))
-                        sm.set_array([])
-                        plt.colorbar(sm, ax=ax, label='Elevation')
+                try:
+                    # Elevations are in node index order, like the graph nodes
+                    elevations = np.asarray(self._statistic('node_elevations'), dtype=np.float32)
+                except Exception:
+                    elevations = None
+                if elevations is None:
+                    self.plot_network(ax=ax, show_pressures=False, show_flows=False)
+                else:
+                    self.plot_network(ax=ax, node_values=elevations, node_cmap=plt.cm.Oranges,
+                                      node_label='Elevation', title='EPANET Network - Elevations')
             elif attribute == 'pressure':
                 self.plot_network(ax=ax, show_pressures=True, show_flows=False)
             elif attribute == 'flow':
@@ -530,6 +1206,107 @@ class EpanetWrapper:
             else:
                 raise ValueError(f"Unknown attribute: {attribute}. Use 'elevation', 'pressure', or 'flow'")
     
+    # plot_type -> (result attribute, element kind, units attribute, title) for time series
+    _TIME_SERIES_KINDS = {
+        'pressure': ('Pressure', 'Node', 'NodePressureUnits', 'Node Pressures Over Time'),
+        'velocity': ('Velocity', 'Link', 'LinkVelocityUnits', 'Link Velocities Over Time'),
+        'flow': ('Flow', 'Link', 'LinkFlowUnits', 'Link Flows Over Time'),
+    }
+    
+    def get_time_series_arrays(self, plot_type: str = 'pressure', indices: Optional[List] = None,
+                               time_unit: str = 'hours') -> Dict:
+        """
+        Extract the data drawn by plot_time_series() without plotting it.
+        
+        Touches no matplotlib objects, so GUIs can call it on a worker thread and
+        only draw the returned arrays (see draw_time_series()) on the GUI thread.
+        
+        Args:
+            plot_type: Type of data ('pressure', 'velocity', 'flow')
+            indices: Node (pressure) or link (velocity, flow) indices (int, 1-based) or IDs (str).
+                     Defaults to all nodes or links.
+            time_unit: Time unit for x-axis ('hours' or 'seconds')
+        
+        Returns:
+            Dictionary with 'time' array, 'series' list of (label, values array) tuples,
+            and 'xlabel', 'ylabel' and 'title' strings
+        
+        Raises:
+            RuntimeError: If no file is loaded or simulation not run
+            ValueError: If plot_type or an ID is unknown
+        """
+        if self.network is None:
+            raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
+        
+        # Get computed time series (runs simulation if needed)
+        res = self.get_computed_time_series()
+        if res is None:
+            raise RuntimeError("Simulation must be run first. Call run_simulation() before plotting time series.")
+        
+        if plot_type not in self._TIME_SERIES_KINDS:
+            raise ValueError(f"Unknown plot_type: {plot_type}. Use 'pressure', 'velocity', or 'flow'")
+        attr, kind, units_attr, title = self._TIME_SERIES_KINDS[plot_type]
+        # One row per node or link, so each selected series is a contiguous row
+        values = self._element_major(attr)
+        
+        # Convert time from seconds to requested unit, once per simulation
+        unit = 'hours' if time_unit == 'hours' else 'seconds'
+        time_data = self._time_axes.get(unit)
+        if time_data is None:
+            time_data = res.Time / 3600 if unit == 'hours' else res.Time
+            self._time_axes[unit] = time_data
+        xlabel = 'Time (hrs)' if unit == 'hours' else 'Time (sec)'
+        
+        names, name_idx = self._id_table(kind)
+        if indices is None:
+            # All nodes or links
+            indices = range(1, len(names) + 1)
+        
+        rows = []
+        for item in indices:
+            if isinstance(item, str):
+                # It's an ID, find its index (EPANET uses 1-based indexing)
+                idx = name_idx.get(item)
+                if idx is None:
+                    raise ValueError(f"{kind} ID '{item}' not found in network")
+            else:
+                # It's already an index
+                idx = int(item)
+            if 1 <= idx <= values.shape[0]:
+                rows.append(idx - 1)
+        
+        # Gather all selected series with one fancy index into a (k, time steps) block
+        block = values[np.asarray(rows, dtype=np.intp)]
+        series = list(zip([f'{kind} {names[row]}' for row in rows], block))
+        
+        return {
+            'time': time_data,
+            'series': series,
+            'xlabel': xlabel,
+            'ylabel': f'{attr} ({getattr(self.network.units, units_attr)})',
+            'title': title,
+        }
+    
+    @staticmethod
+    def draw_time_series(ax, data: Dict) -> None:
+        """
+        Draw time series returned by get_time_series_arrays() on an axes.
+        
+        Args:
+            ax: Matplotlib axes object to draw on
+            data: Dictionary from get_time_series_arrays()
+        """
+        if data['series']:
+            # One plot() call for all series: columns of the 2D array become lines
+            labels, values = zip(*data['series'])
+            ax.plot(data['time'], np.column_stack(values), label=list(labels), marker=None)
+        # Decorate the axes in one call once the data is drawn
+        ax.set(xlabel=data['xlabel'], ylabel=data['ylabel'], title=data['title'])
+        if data['series']:
+            ax.legend()
+        ax.grid(True, alpha=0.3)
+    
     def plot_time_series(self, ax=None, node_indices: Optional[List] = None,
                         link_indices: Optional[List] = None,
                         plot_type: str = 'pressure', time_unit: str = 'hours'):
@@ -551,122 +1328,24 @@ class EpanetWrapper:
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
         
-        # Get computed time series (runs simulation if needed)
-        res = self.get_computed_time_series()
-        if res is None:
+        if self.get_computed_time_series() is None:
             raise RuntimeError("Simulation must be run first. Call run_simulation() before plotting time series.")
         
         try:
-            # Convert time from seconds to requested unit
-            if time_unit == 'hours':
-                time_data = res.Time / 3600
-                xlabel = 'Time (hrs)'
-            else:
-                time_data = res.Time
-                xlabel = 'Time (sec)'
+            data = self.get_time_series_arrays(
+                plot_type, node_indices if plot_type == 'pressure' else link_indices, time_unit)
             
-            # Create figure if no axes provided
+            # Create figure if no axes provided, reusing the previous one while it is open
             if ax is None:
-                fig, ax = plt.subplots(figsize=(10, 6))
-            
-            if plot_type == 'pressure':
-                if node_indices is None:
-                    # Plot all nodes
-                    node_indices = list(range(1, self.get_statistics()['node_count'] + 1))
-                
-                # Convert node IDs to indices if needed
-                node_indices_to_plot = []
-                node_names = self.network.getNodeNameID()
-                
-                for item in node_indices:
-                    if isinstance(item, str):
-                        # It's a node ID, find its index
-                        try:
-                            idx = node_names.index(item) + 1  # EPANET uses 1-based indexing
-                            node_indices_to_plot.append(idx)
-                        except ValueError:
-                            raise ValueError(f"Node ID '{item}' not found in network")
-                    else:
-                        # It's already an index
-                        node_indices_to_plot.append(int(item))
-                
-                for node_idx in node_indices_to_plot:
-                    if node_idx <= len(res.Pressure[0]):
-                        node_name = self.network.getNodeNameID(node_idx)
-                        ax.plot(time_data, res.Pressure[:, node_idx - 1],
-                               label=f'Node {node_name}', marker=None)
-                ax.set_ylabel(f'Pressure ({self.network.units.NodePressureUnits})')
-                ax.set_title('Node Pressures Over Time')
+                ax = self._standalone_axes(figsize=(10, 6))
             
-            elif plot_type == 'velocity':
-                if link_indices is None:
-                    # Plot all links
-                    link_indices = list(range(1, self.get_statistics()['link_count'] + 1))
-                
-                # Convert link IDs to indices if needed
-                link_indices_to_plot = []
-                link_names = self.network.getLinkNameID()
-                
-                for item in link_indices:
-                    if isinstance(item, str):
-                        # It's a link ID, find its index
-                        try:
-                            idx = link_names.index(item) + 1  # EPANET uses 1-based indexing
-                            link_indices_to_plot.append(idx)
-                        except ValueError:
-                            raise ValueError(f"Link ID '{item}' not found in network")
-                    else:
-                        # It's already an index
-                        link_indices_to_plot.append(int(item))
-                
-                for link_idx in link_indices_to_plot:
-                    if link_idx <= len(res.Velocity[0]):
-                        link_name = self.network.getLinkNameID(link_idx)
-                        ax.plot(time_data, res.Velocity[:, link_idx - 1],
-                               label=f'Link {link_name}', marker=None)
-                ax.set_ylabel(f'Velocity ({self.network.units.LinkVelocityUnits})')
-                ax.set_title('Link Velocities Over Time')
-            
-            elif plot_type == 'flow':
-                if link_indices is None:
-                    # Plot all links
-                    link_indices = list(range(1, self.get_statistics()['link_count'] + 1))
-                
-                # Convert link IDs to indices if needed
-                link_indices_to_plot = []
-                link_names = self.network.getLinkNameID()
-                
-                for item in link_indices:
-                    if isinstance(item, str):
-                        # It's a link ID, find its index
-                        try:
-                            idx = link_names.index(item) + 1  # EPANET uses 1-based indexing
-                            link_indices_to_plot.append(idx)
-                        except ValueError:
-                            raise ValueError(f"Link ID '{item}' not found in network")
-                    else:
-                        # It's already an index
-                        link_indices_to_plot.append(int(item))
-                
-                for link_idx in link_indices_to_plot:
-                    if link_idx <= len(res.Flow[0]):
-                        link_name = self.network.getLinkNameID(link_idx)
-                        ax.plot(time_data, res.Flow[:, link_idx - 1],
-                               label=f'Link {link_name}', marker=None)
-                ax.set_ylabel(f'Flow ({self.network.units.LinkFlowUnits})')
-                ax.set_title('Link Flows Over Time')
-            
-            else:
-                raise ValueError(f"Unknown plot_type: {plot_type}. Use 'pressure', 'velocity', or 'flow'")
-            
-            ax.set_xlabel(xlabel)
-            ax.legend()
-            ax.grid(True, alpha=0.3)
+            self.draw_time_series(ax, data)
                 
         except Exception as e:
             raise RuntimeError(f"Time series plotting failed: {e}") from e
     
-    def plot_network_topology(self, ax=None, use_epyt_native: bool = False, **kwargs):
+    def plot_network_topology(self, ax=None, use_epyt_native: bool = False, rasterized: bool = True,
+                              **kwargs):
         """
         Plot network topology with various options.
         
@@ -675,6 +1354,9 @@ class EpanetWrapper:
         Args:
             ax: Matplotlib axes object (optional)
             use_epyt_native: If True, use epyt's native plotting; if False, use NetworkX
+            rasterized: If True (NetworkX only), pipes are drawn as one bitmap in vector
+                output, which keeps PDF/SVG exports of large networks small and fast to render.
+                epyt's native plot always draws every pipe as its own vector line.
             **kwargs: Additional arguments for epyt.plot() when use_epyt_native=True
                      (e.g., nodesID=True, linksID=True, highlightnode=['10'], etc.)
         
@@ -683,30 +1365,40 @@ class EpanetWrapper:
         """
         if self.network is None:
             raise RuntimeError("No EPANET file loaded. Please load a file first.")
+        self._ensure_current()
         
         if use_epyt_native:
             # Use epyt's native plotting
             # Filter out problematic kwargs - only pass valid epyt.plot() parameters
             try:
-                plot_kwargs = {}
-                valid_epyt_params = ['nodesID', 'linksID', 'nodesindex', 'linksindex', 
-                                    'highlightlink', 'highlightnode', 'point', 'line', 
-                                    'legend', 'title']
-                
-                for key, value in kwargs.items():
-                    # Only pass valid epyt parameters
-                    if key in valid_epyt_params:
-                        plot_kwargs[key] = value
-                    # Skip boolean values that aren't in valid list
-                    elif not isinstance(value, bool):
-                        plot_kwargs[key] = value
+                plot_kwargs = _epyt_plot_kwargs(kwargs)
                 
                 self.network.plot(**plot_kwargs)
             except Exception as e:
                 raise RuntimeError(f"Plotting failed: {e}") from e
         else:
             # Use our NetworkX implementation (preferred for better control)
-            self.plot_network(ax=ax, show_pressures=False, show_flows=False)
+            self.plot_network(ax=ax, show_pressures=False, show_flows=False, rasterized=rasterized)
+    
+    def _node_value_dict(self, values):
+        """
+        Map per-node values in EPANET index order to node IDs.
+        
+        Args:
+            values: Node values as returned by the toolkit
+        
+        Returns:
+            Dictionary mapping node IDs to values, or values unchanged if not a list/array
+        """
+        # ndarray first - that is what epyt returns; tolist() yields Python floats in one pass
+        if isinstance(values, np.ndarray):
+            values = values.astype(np.float64, copy=False)
+        elif isinstance(values, list):
+            values = np.asarray(values, dtype=np.float64)
+        else:
+            return values
+        node_names, _ = self._id_table('Node')
+        return dict(zip(node_names, values.tolist()))
     
     def get_node_elevations(self) -> Optional[Dict[str, float]]:
         """
@@ -715,16 +1407,20 @@ class EpanetWrapper:
         Returns:
             Dictionary mapping node IDs to elevation values, or None if not available
         """
-        stats = self.get_statistics()
-        elevations = stats.get('node_elevations')
-        if elevations is None:
+        if self.network is None:
+            return None
+        try:
+            elevations = self._statistic('node_elevations')
+        except Exception:
             return None
         
-        # Convert to dict if it's a list/array
-        if isinstance(elevations, (list, np.ndarray)):
-            node_names = stats.get('node_names', [])
-            return {name: float(elev) for name, elev in zip(node_names, elevations)}
-        return elevations
+        return self._node_value_dict(elevations)
+    
+    # Attributes served by wrapper methods instead of a network getNode* getter
+    _NODE_ATTRIBUTE_METHODS = {
+        'elevation': 'get_node_elevations',
+        'pressure': 'get_node_pressures',
+    }
     
     def get_node_attribute(self, attribute: str) -> Optional[Dict]:
         """
@@ -740,34 +1436,103 @@ class EpanetWrapper:
             return None
         
         try:
-            if attribute == 'elevation':
-                return self.get_node_elevations()
-            elif attribute == 'pressure':
-                return self.get_node_pressures()
-            else:
-                # Try to get attribute using getNode* methods
-                method_name = f'getNode{attribute.capitalize()}'
-                if hasattr(self.network, method_name):
-                    method = getattr(self.network, method_name)
-                    values = method()
-                    node_names = self.network.getNodeNameID()
-                    if isinstance(values, (list, np.ndarray)):
-                        return {name: float(val) for name, val in zip(node_names, values)}
-                    return values
+            wrapper_method = self._NODE_ATTRIBUTE_METHODS.get(attribute)
+            if wrapper_method is not None:
+                return getattr(self, wrapper_method)()
+            
+            # Try to get attribute using getNode* methods, resolved once per attribute
+            self._ensure_current()
+            method = self._node_getters.get(attribute)
+            if method is None and attribute not in self._node_getters:
+                method = getattr(self.network, f'getNode{attribute.capitalize()}', None)
+                self._node_getters[attribute] = method
+            if method is None:
+                return None
+            
+            return self._node_value_dict(method())
         except Exception:
             pass
         return None
     
     def close(self) -> None:
         """Close the network and clean up resources."""
-        if self.network is not None:
+        global _toolkit_owner
+        if self.network is None:
+            return  # Already closed
+        
+        # Only unload the toolkit if it still holds this network, not another wrapper's
+        if _toolkit_owner is self:
             try:
                 self.network.unload()
             except Exception:
                 pass  # Ignore errors during cleanup
-            finally:
-                self.network = None
-                self.inp_file = None
-                self._statistics = None
-                self._computed_time_series = None
+            _toolkit_owner = None
+        
+        self.network = None
+        self.inp_file = None
+        self._sim_method = None
+        self._node_getters = {}
+        self._statistics = {}
+        self._node_idx = None
+        self._link_idx = None
+        self._computed_time_series = None
+        self._sim_results = None
+        self._sim_averages = None
+        self._element_results = {}
+        self._time_axes = {}
+        self._network_graph = None
+        self._edge_link_rows = None
+        self._node_pos = None
+        self._node_xy = None
+        self._node_coords = None
+        self._edge_segments = None
+        self._file_hash = None
+        self._edge_lod = None
+        self._standalone_ax = None
+        self._remove_spooled_file()
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_wrapper(path: str, mtime_ns: int, size: int) -> EpanetWrapper:
+    """Load a file into a new wrapper and precompute its layout (cached by get_or_build)."""
+    wrapper = EpanetWrapper(Path(path))
+    wrapper.precompute_layout()
+    return wrapper
+
+
+def get_or_build(inp_file: Path) -> EpanetWrapper:
+    """
+    Get a loaded and laid-out EpanetWrapper for an input file, reusing recent ones.
+    
+    Wrappers are cached by (path, modification time, size), so reopening the file
+    that is still loaded in the toolkit skips loading, layout and any simulation
+    already run on it. A cached wrapper whose file was replaced in the toolkit by
+    another load is loaded again, dropping its results and statistics.
+    The returned wrapper is shared and must not be closed by the caller.
+    
+    Args:
+        inp_file: Path to the .inp file
+        
+    Returns:
+        EpanetWrapper with the file loaded
+        
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not a .inp file
+    """
+    inp_path = Path(inp_file).resolve()
+    if not inp_path.exists():
+        raise FileNotFoundError(f"File not found: {inp_path}")
+    
+    stat = inp_path.stat()
+    wrapper = _cached_wrapper(str(inp_path), stat.st_mtime_ns, stat.st_size)
+    if not wrapper.is_current():
+        # epyt keeps one global project, so another file was loaded over this one
+        wrapper.load_file(inp_path)
+        wrapper.precompute_layout()
+    return wrapper
+
 
+def reset_caches() -> None:
+    """Drop all wrappers cached by get_or_build() so files are reloaded from disk."""
+    _cached_wrapper.cache_clear()